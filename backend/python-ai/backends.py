@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+CPU inference backends for the MindSpark summarizers
+Full-precision PyTorch, dynamic INT8 PyTorch and exported ONNX Runtime models
+"""
+
+import os
+import re
+import sys
+import shutil
+import json
+import time
+import argparse
+
+from metrics import peak_rss_mb
+
+BACKENDS = ("pytorch", "int8", "onnx")
+DEFAULT_BACKEND = "pytorch"
+
+# Only PyTorch models are used; stop transformers from importing TensorFlow too
+os.environ.setdefault("USE_TF", "0")
+
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mindspark", "onnx")
+MAPPED_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mindspark", "mapped")
+
+def model_label(model_name, backend=DEFAULT_BACKEND):
+    """Identify a model and backend pair, e.g. in cache keys and reports"""
+    return model_name if backend == DEFAULT_BACKEND else f"{model_name}+{backend}"
+
+def onnx_export_dir(model_name):
+    return os.path.join(ONNX_CACHE_DIR, re.sub(r'[^A-Za-z0-9_.-]+', '--', model_name))
+
+def load_pytorch(model_name):
+    from transformers import pipeline
+    return pipeline("summarization", model=model_name, device=-1)
+
+def load_int8(model_name):
+    """Dynamically quantize the Linear layers of a PyTorch model to INT8"""
+    import torch
+    from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("summarization", model=quantized, tokenizer=tokenizer, device=-1)
+
+def _import_ort_model():
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise RuntimeError("The onnx backend requires: pip install optimum[onnxruntime]")
+    return ORTModelForSeq2SeqLM
+
+def export_onnx(model_name):
+    """Export the model to ONNX once, returning the export directory
+
+    The export is written to a temporary directory and renamed into place,
+    so a crashed export never leaves a half-written directory behind and
+    concurrent exporters never see one: the first rename wins and the
+    others discard their copy.
+    """
+    export_dir = onnx_export_dir(model_name)
+    if os.path.isdir(export_dir):
+        return export_dir
+    ORTModelForSeq2SeqLM = _import_ort_model()
+    from transformers import AutoTokenizer
+
+    print(f"📦 Exporting {model_name} to ONNX in {export_dir}...", file=sys.stderr)
+    os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+    temp_dir = f"{export_dir}.{os.getpid()}.tmp"
+    try:
+        ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True).save_pretrained(temp_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(temp_dir)
+        os.replace(temp_dir, export_dir)
+    except OSError:
+        if not os.path.isdir(export_dir):
+            raise
+        # Another process finished its export first
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return export_dir
+
+def load_onnx(model_name):
+    """Load an ONNX Runtime export of the model, exporting it on first use"""
+    ORTModelForSeq2SeqLM = _import_ort_model()
+    from transformers import pipeline, AutoTokenizer
+
+    export_dir = export_onnx(model_name)
+    model = ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+    tokenizer = AutoTokenizer.from_pretrained(export_dir)
+    return pipeline("summarization", model=model, tokenizer=tokenizer, device=-1)
+
+def mapped_weights_path(model_name):
+    return os.path.join(MAPPED_CACHE_DIR, re.sub(r'[^A-Za-z0-9_.-]+', '--', model_name) + ".pt")
+
+def export_weights(model_name):
+    """Save the model's weights once as a single file that processes can memory-map"""
+    path = mapped_weights_path(model_name)
+    if not os.path.exists(path):
+        import torch
+        from transformers import AutoModelForSeq2SeqLM
+
+        print(f"📦 Exporting {model_name} weights to {path}...", file=sys.stderr)
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        os.makedirs(MAPPED_CACHE_DIR, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(model.state_dict(), temp_path)
+        os.replace(temp_path, path)
+    return path
+
+def load_mapped(model_name):
+    """Full-precision pipeline whose weights stay pages of the memory-mapped export
+
+    The model is built on the meta device and its parameters are assigned
+    the mapped tensors instead of copies, so every process loading the same
+    file shares one copy of the weights in the page cache. Needs torch>=2.1.
+    """
+    import torch
+    from transformers import pipeline, AutoConfig, AutoTokenizer, AutoModelForSeq2SeqLM
+
+    path = export_weights(model_name)
+    config = AutoConfig.from_pretrained(model_name)
+    with torch.device("meta"):
+        model = AutoModelForSeq2SeqLM.from_config(config)
+    model.load_state_dict(torch.load(path, mmap=True, weights_only=True), assign=True)
+    model.tie_weights()
+    if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+        raise RuntimeError(f"{path} does not cover every weight of {model_name}")
+    model.eval()
+    return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(model_name), device=-1)
+
+LOADERS = {
+    "pytorch": load_pytorch,
+    "int8": load_int8,
+    "onnx": load_onnx,
+}
+
+def load_summarizer(model_name, backend=DEFAULT_BACKEND):
+    """Build a summarization pipeline for model_name on the given backend"""
+    if backend not in LOADERS:
+        raise ValueError(f"Unknown backend: {backend}")
+    return LOADERS[backend](model_name)
+
+def rouge_scores(candidate, reference):
+    """ROUGE-1 and ROUGE-L F1 between two summaries"""
+    cand = re.findall(r'\w+', candidate.lower())
+    ref = re.findall(r'\w+', reference.lower())
+    if not cand or not ref:
+        return {"rouge1": 0.0, "rougeL": 0.0}
+
+    ref_counts = {}
+    for token in ref:
+        ref_counts[token] = ref_counts.get(token, 0) + 1
+    overlap = 0
+    for token in cand:
+        if ref_counts.get(token, 0) > 0:
+            ref_counts[token] -= 1
+            overlap += 1
+
+    # Longest common subsequence, one row at a time
+    previous = [0] * (len(ref) + 1)
+    for token in cand:
+        current = [0]
+        for j, ref_token in enumerate(ref):
+            current.append(previous[j] + 1 if token == ref_token else max(previous[j + 1], current[j]))
+        previous = current
+    lcs = previous[-1]
+
+    def f1(matches):
+        if not matches:
+            return 0.0
+        precision = matches / len(cand)
+        recall = matches / len(ref)
+        return round(2 * precision * recall / (precision + recall), 4)
+
+    return {"rouge1": f1(overlap), "rougeL": f1(lcs)}
+
+def _run_backend(model_name, backend, documents, max_length, min_length, results):
+    """Child process body: load one backend and summarize the corpus"""
+    try:
+        start = time.time()
+        summarizer = load_summarizer(model_name, backend)
+        load_time = time.time() - start
+
+        summaries = []
+        latencies = []
+        for text in documents:
+            start = time.time()
+            output = summarizer(text, max_length=max_length, min_length=min_length, do_sample=False, truncation=True)
+            latencies.append(time.time() - start)
+            summaries.append(output[0]['summary_text'])
+
+        results.put({
+            "backend": backend,
+            "load_seconds": round(load_time, 3),
+            "mean_latency": round(sum(latencies) / len(latencies), 3),
+            "total_seconds": round(sum(latencies), 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "summaries": summaries
+        })
+    except Exception as e:
+        results.put({"backend": backend, "error": str(e)})
+
+def compare_backends(documents, model_name, backends=BACKENDS, max_length=150, min_length=50):
+    """Latency, peak RSS and ROUGE drift of each backend against the fp32 baseline
+
+    Each backend runs in its own process so peak RSS is not shared.
+    """
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    reports = {}
+    for backend in dict.fromkeys((DEFAULT_BACKEND,) + tuple(backends)):
+        print(f"⏱️ Running {backend} backend on {len(documents)} documents...", file=sys.stderr)
+        results = context.Queue()
+        process = context.Process(
+            target=_run_backend,
+            args=(model_name, backend, documents, max_length, min_length, results)
+        )
+        process.start()
+        reports[backend] = results.get()
+        process.join()
+
+    baseline = reports[DEFAULT_BACKEND].get("summaries")
+    for backend, report in reports.items():
+        summaries = report.pop("summaries", None)
+        if not baseline or not summaries:
+            continue
+        scores = [rouge_scores(s, b) for s, b in zip(summaries, baseline)]
+        report["rouge1_vs_fp32"] = round(sum(s["rouge1"] for s in scores) / len(scores), 4)
+        report["rougeL_vs_fp32"] = round(sum(s["rougeL"] for s in scores) / len(scores), 4)
+        base_latency = reports[DEFAULT_BACKEND]["mean_latency"]
+        if report.get("mean_latency"):
+            report["speedup_vs_fp32"] = round(base_latency / report["mean_latency"], 2)
+
+    return {"model": model_name, "documents": len(documents), "backends": list(reports.values())}
+
+def load_corpus(path):
+    """Read every .txt file in a directory (or a single file) as one document"""
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith('.txt')
+        )
+    documents = []
+    for file_path in paths:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read().strip()
+        if text:
+            documents.append(text)
+    return documents
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare MindSpark summarizer inference backends")
+    parser.add_argument("--corpus", required=True, help="Directory of .txt documents or a single .txt file")
+    parser.add_argument("--model", default="facebook/bart-large-cnn", help="Model to compare")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                        help="Backends to compare against the fp32 pytorch baseline")
+    parser.add_argument("--max-length", type=int, default=150, help="Maximum summary length")
+    parser.add_argument("--min-length", type=int, default=50, help="Minimum summary length")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus)
+    if not documents:
+        print("Error: No documents found in corpus", file=sys.stderr)
+        sys.exit(1)
+
+    report = compare_backends(documents, args.model, args.backends, args.max_length, args.min_length)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,156 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import os
 import sys
 import json
+import math
+import heapq
 import argparse
-from transformers import pipeline
+import metrics
+from chunking import chunk_text, log_stats
+from summarization import summarize_chunks, record_outputs, is_fallback, ReduceTree, DEFAULT_BATCH_SIZE
+from result_cache import open_cache, cached_call
+from parallel import setup_schedule, SCHEDULES, SHARING
+from incremental import load_state, save_state, plan_chunks
+from text_input import read_input, is_blank, as_text
+from decoding import PROFILES
+from lexicon import load_lexicon, tokenize
+from keyphrases import count_terms
+from document_model import stream_sentences
+from backends import load_summarizer, model_label, onnx_export_dir, BACKENDS, DEFAULT_BACKEND
 
-def setup_summarizer():
-    """Initialize the summarization pipeline with BART model"""
+MODEL_NAME = "facebook/bart-large-cnn"
+FALLBACK_MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+
+COMMON_WORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'this', 'that', 'these', 'those', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'shall'}
+
+# Words that mark a sentence as a likely key point
+KEY_TERMS = load_lexicon("keypoint", {"keypoint": ['important', 'key', 'main', 'significant', 'primary']})
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+def load_model(backend=DEFAULT_BACKEND):
+    """Load BART, falling back to DistilBART; returns (pipeline or None, model name)"""
     try:
-        print("🔄 Loading BART summarization model...", file=sys.stderr)
-        summarizer = pipeline(
-            "summarization", 
-            model="facebook/bart-large-cnn",
-            device=-1  # Use CPU
-        )
+        print(f"🔄 Loading BART summarization model ({backend})...", file=sys.stderr)
+        summarizer = load_summarizer(MODEL_NAME, backend)  # CPU only
         print("✅ BART model loaded successfully", file=sys.stderr)
-        return summarizer
+        return summarizer, MODEL_NAME
     except Exception as e:
         print(f"❌ Failed to load BART model: {e}", file=sys.stderr)
         try:
             print("🔄 Falling back to DistilBART...", file=sys.stderr)
-            summarizer = pipeline(
-                "summarization", 
-                model="sshleifer/distilbart-cnn-12-6",
-                device=-1
-            )
+            summarizer = load_summarizer(FALLBACK_MODEL_NAME, backend)
             print("✅ DistilBART model loaded successfully", file=sys.stderr)
-            return summarizer
+            return summarizer, FALLBACK_MODEL_NAME
         except Exception as e2:
             print(f"❌ Failed to load DistilBART model: {e2}", file=sys.stderr)
-            return None
+            return None, None
+
+def setup_summarizer(backend=DEFAULT_BACKEND):
+    """Initialize the summarization pipeline with BART model"""
+    return load_model(backend)[0]
 
-def extract_key_points(text, max_points=5):
-    """Extract key points from text using simple sentence analysis"""
-    sentences = [s.strip() for s in text.split('.') if len(s.strip()) > 30]
+def model_name_of(summarizer):
+    """Model behind an already loaded pipeline, assumed BART when it does not say"""
+    name = getattr(getattr(summarizer, 'model', None), 'name_or_path', None) or MODEL_NAME
+    for model_name in (MODEL_NAME, FALLBACK_MODEL_NAME):
+        if name == onnx_export_dir(model_name):  # ONNX models are loaded from their export
+            return model_name
+    return name
+
+def count_document_terms(text):
+    """Frequent words and phrases of the document, shared by key points and concepts"""
+    counter = count_terms(text, COMMON_WORDS)
+    if hasattr(text, 'seek'):
+        text.seek(0)
+    return counter
+
+def extract_key_points(text, max_points=5, counter=None):
+    """Extract key points: the sentences that best cover the document's frequent terms
+
+    Sentences across the whole document are streamed and only the current
+    top `max_points` are kept on a heap. `text` may be a string, a Document
+    or a seekable text file; `counter` reuses count_document_terms output.
+    """
+    if counter is None:
+        counter = count_document_terms(text)
+    weights = counter.term_weights()
     
-    # Simple scoring based on sentence length and position
-    scored_sentences = []
-    for i, sentence in enumerate(sentences[:20]):  # Limit to first 20 sentences
-        score = len(sentence.split())  # Word count
-        if i < 3:  # Boost early sentences
+    heap = []
+    position = 0
+    for sentence in stream_sentences(text):
+        if len(sentence) <= 30:
+            continue
+        tokens = tokenize(sentence)
+        if not tokens:  # Punctuation-only runs, e.g. from PDF or CSV extraction
+            continue
+        # Frequent-term coverage, damped so long sentences don't win on length alone
+        score = sum(weights.get(token, 0) for token in tokens) / math.sqrt(len(tokens))
+        if position < 3:  # Boost early sentences
             score *= 1.5
-        if any(keyword in sentence.lower() for keyword in ['important', 'key', 'main', 'significant', 'primary']):
+        if KEY_TERMS.contains(tokens):
             score *= 1.3
-        scored_sentences.append((sentence, score))
+        entry = (score, -position, sentence)  # Ties go to the earlier sentence
+        if len(heap) < max_points:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+        position += 1
     
-    # Sort by score and take top points
-    scored_sentences.sort(key=lambda x: x[1], reverse=True)
-    key_points = [sentence for sentence, _ in scored_sentences[:max_points]]
-    
-    return key_points
+    return [sentence for _, _, sentence in sorted(heap, reverse=True)]
 
-def extract_concepts(text, max_concepts=4):
-    """Extract main concepts from text"""
-    # Simple keyword extraction
-    common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'this', 'that', 'these', 'those', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'shall'}
-    
-    words = text.lower().split()
-    word_freq = {}
-    
-    for word in words:
-        word = word.strip('.,!?;:"()[]{}').lower()
-        if len(word) > 3 and word not in common_words and word.isalpha():
-            word_freq[word] = word_freq.get(word, 0) + 1
-    
-    # Get most frequent meaningful words as concepts
-    sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-    concepts = [word.title() for word, _ in sorted_words[:max_concepts]]
-    
-    return concepts
+def extract_concepts(text, max_concepts=4, counter=None):
+    """Extract main concepts: the most frequent words and recurring phrases
+
+    Counting is streamed into capped heavy-hitter tables, so very large
+    inputs stay fast and flat in memory.
+    """
+    if counter is None:
+        counter = count_document_terms(text)
+    return [term.title() for term in counter.concepts(max_concepts)]
 
-def process_document(text, max_length=150, min_length=50):
-    """Process document with AI summarization and analysis"""
+def process_document(text, max_length=150, min_length=50, summarizer=None, batch_size=DEFAULT_BATCH_SIZE, overlap=0, cache=None, pool=None, backend=DEFAULT_BACKEND, on_event=None, state_path=None, fan_in=None, profile=None):
+    """Process document with AI summarization and analysis, using the result cache when given
+
+    `on_event(record)` receives partial results (chunk summaries, key
+    points, concepts) as soon as they are available. With `state_path`,
+    chunk summaries from the previous run of this document are reused for
+    every chunk whose content did not change. With `fan_in`, chunk summaries
+    are merged by a multi-level reduce instead of being concatenated.
+    `profile` picks a decoding profile from decoding.PROFILES.
+    """
+    # Keyed before any model is loaded, so a cache hit skips the load; a
+    # result from the DistilBART fallback is stored under its own key
+    model = model_label(model_name_of(summarizer) if summarizer else MODEL_NAME, backend)
+    params = {"max_length": max_length, "min_length": min_length, "overlap": overlap, "fan_in": fan_in}
+    if profile:
+        params["profile"] = profile
+    if state_path:
+        # The state file must be refreshed every run, so skip the whole-document cache
+        return summarize_document(text, max_length, min_length, summarizer, batch_size, overlap, pool, backend, on_event, state_path, fan_in, profile)
+    return cached_call(
+        cache,
+        text,
+        model,
+        "bart",
+        params,
+        lambda: summarize_document(text, max_length, min_length, summarizer, batch_size, overlap, pool, backend, on_event, fan_in=fan_in, profile=profile),
+        model_of=lambda result: result.get("model", model)
+    )
+
+def summarize_document(text, max_length=150, min_length=50, summarizer=None, batch_size=DEFAULT_BATCH_SIZE, overlap=0, pool=None, backend=DEFAULT_BACKEND, on_event=None, state_path=None, fan_in=None, profile=None):
+    """Summarize and analyze a document without consulting the cache"""
     try:
-        # Setup summarizer
-        summarizer = setup_summarizer()
+        # Setup summarizer unless a long-lived worker already loaded one
+        if summarizer is None and pool is not None:
+            summarizer = pool.summarizer  # Shares the workers' weights instead of loading another copy
+        if summarizer is None:
+            with metrics.stage("model_load"):
+                summarizer, model_name = load_model(backend)
+        else:
+            model_name = model_name_of(summarizer)
         
         if not summarizer:
             return {
@@ -84,55 +161,87 @@ def process_document(text, max_length=150, min_length=50):
                 "processedBy": "Text Analysis Only"
             }
         
-        # Split text into chunks if too long (BART has token limits)
-        max_chunk_length = 1000  # Conservative limit
-        chunks = []
+        # Pack whole sentences into chunks that fit BART's token limit; incremental
+        # runs use content-defined boundaries so edits don't shift later chunks
+        chunks, chunk_stats = chunk_text(
+            text,
+            getattr(summarizer, 'tokenizer', None),
+            overlap=overlap,
+            anchored=bool(state_path)
+        )
+        log_stats(chunk_stats)
         
-        if len(text) > max_chunk_length:
-            words = text.split()
-            current_chunk = []
-            current_length = 0
-            
-            for word in words:
-                current_chunk.append(word)
-                current_length += len(word) + 1
-                
-                if current_length >= max_chunk_length:
-                    chunks.append(' '.join(current_chunk))
-                    current_chunk = []
-                    current_length = 0
-            
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-        else:
-            chunks = [text]
+        state_params = {"model": model_label(model_name, backend), "max_length": max_length, "min_length": min_length, "overlap": overlap}
+        if profile:
+            state_params["profile"] = profile
+        fingerprints, summaries, pending = plan_chunks(chunks, load_state(state_path, state_params))
+        if state_path:
+            print(f"♻️ Reusing {len(chunks) - len(pending)}/{len(chunks)} chunk summaries", file=sys.stderr)
         
-        print(f"📝 Processing {len(chunks)} chunks...", file=sys.stderr)
+        print(f"📝 Processing {len(pending)} chunks...", file=sys.stderr)
+        
+        if on_event:
+            for i, summary in enumerate(summaries):
+                if summary is not None:
+                    on_event({"type": "chunk", "index": i, "total": len(chunks), "summary": summary, "reused": True})
+        
+        def on_summary(position, summary):
+            summaries[pending[position]] = summary
+            if on_event:
+                on_event({"type": "chunk", "index": pending[position], "total": len(chunks), "summary": summary})
+        
+        # Summarize changed chunks in batches, falling back per chunk on failure
+        pending_chunks = [chunks[i] for i in pending]
+        if pool is not None:
+            with metrics.stage("generation"):
+                pool.summarize(pending_chunks, max_length, min_length, batch_size, on_summary, profile)
+            record_outputs([summaries[i] for i in pending], getattr(summarizer, 'tokenizer', None))
+        else:
+            summarize_chunks(
+                summarizer,
+                pending_chunks,
+                max_length=max_length,
+                min_length=min_length,
+                batch_size=batch_size,
+                on_summary=on_summary,
+                profile=profile
+            )
         
-        # Summarize each chunk
-        summaries = []
-        for i, chunk in enumerate(chunks):
-            try:
-                print(f"🧠 Summarizing chunk {i+1}/{len(chunks)}...", file=sys.stderr)
-                summary = summarizer(
-                    chunk, 
-                    max_length=max_length, 
-                    min_length=min_length, 
-                    do_sample=False
-                )
-                summaries.append(summary[0]['summary_text'])
-            except Exception as e:
-                print(f"❌ Failed to summarize chunk {i+1}: {e}", file=sys.stderr)
-                # Fallback to first few sentences
-                sentences = chunk.split('.')[:3]
-                summaries.append('. '.join(sentences) + '.')
+        if state_path:
+            # Fallbacks stand in for failed model calls; leave them out so the next run retries them
+            fell_back = {i for i in pending if is_fallback(chunks[i], summaries[i])}
+            kept = [i for i in range(len(chunks)) if i not in fell_back]
+            save_state(state_path, state_params, [fingerprints[i] for i in kept], [summaries[i] for i in kept])
         
-        # Combine summaries
-        final_summary = ' '.join(summaries)
+        # Combine summaries, through a reduce tree when a fan-in is set
+        reduce_stats = None
+        if fan_in and len(summaries) > 1:
+            tree = ReduceTree(
+                summarizer,
+                max_length=max_length,
+                min_length=min_length,
+                fan_in=fan_in,
+                budget=chunk_stats["token_budget"],
+                tokenizer=getattr(summarizer, 'tokenizer', None),
+                profile=profile
+            )
+            for summary in summaries:
+                tree.add(summary)
+            final_summary = tree.result()
+            reduce_stats = tree.stats()
+        else:
+            final_summary = ' '.join(summaries)
         
         # Extract additional information
-        key_points = extract_key_points(text)
-        concepts = extract_concepts(text)
+        with metrics.stage("postprocess"):
+            counter = count_document_terms(text)
+            key_points = extract_key_points(text, counter=counter)
+        if on_event:
+            on_event({"type": "keyPoints", "keyPoints": key_points})
+        with metrics.stage("postprocess"):
+            concepts = extract_concepts(text, counter=counter)
+        if on_event:
+            on_event({"type": "concepts", "concepts": concepts})
         
         result = {
             "summary": final_summary,
@@ -140,9 +249,18 @@ def process_document(text, max_length=150, min_length=50):
             "concepts": concepts,
             "importance": "This document contains valuable information for study and reference purposes.",
             "processedBy": "BART AI Summarization",
+            "model": model_label(model_name, backend),
             "timestamp": "2025-10-04T21:00:00Z",
-            "chunkCount": len(chunks)
+            "chunkCount": len(chunks),
+            "chunkStats": chunk_stats
         }
+        if reduce_stats:
+            result["reduceStats"] = reduce_stats
+        if state_path:
+            result["incremental"] = {
+                "reusedChunks": len(chunks) - len(pending),
+                "summarizedChunks": len(pending)
+            }
         
         print("✅ AI summarization completed successfully", file=sys.stderr)
         return result
@@ -157,16 +275,73 @@ def process_document(text, max_length=150, min_length=50):
             "processedBy": "Error Fallback"
         }
 
+def emit_record(record):
+    """Write one NDJSON record and flush so the caller sees it immediately"""
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
 def main():
     parser = argparse.ArgumentParser(description='Process document with AI summarization')
-    parser.add_argument('--text', required=True, help='Text content to process')
+    parser.add_argument('--text', help='Text content to process (default: read stdin)')
+    parser.add_argument('--file', help='File containing text to process (memory-mapped)')
+    parser.add_argument('--framed', action='store_true', help='Read one length-prefixed frame from stdin (4-byte big-endian length + UTF-8)')
     parser.add_argument('--max-length', type=int, default=150, help='Maximum summary length')
     parser.add_argument('--min-length', type=int, default=50, help='Minimum summary length')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Number of chunks per summarization batch')
+    parser.add_argument('--overlap', type=int, default=0, help='Tokens of trailing sentences repeated between chunks')
+    parser.add_argument('--no-cache', action='store_true', help='Skip the persistent result cache')
+    parser.add_argument('--fan-in', type=int, help='Merge chunk summaries with a reduce tree of this fan-in instead of concatenating them')
+    parser.add_argument('--incremental', metavar='STATE_FILE', help='Reuse unchanged chunk summaries from STATE_FILE and update it')
+    parser.add_argument('--stream', action='store_true', help='Write NDJSON records as chunk summaries finish, then the final result')
+    parser.add_argument('--profile', choices=list(PROFILES), help='Decoding profile; "assisted" drafts with DistilBART and verifies with BART-large')
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND, help='Inference backend for the summarization model')
+    parser.add_argument('--schedule', choices=SCHEDULES, default='intra', help='intra: all cores per generate call; inter: parallel worker processes')
+    parser.add_argument('--processes', type=int, help='Worker processes for --schedule inter (default: cores / 4)')
+    parser.add_argument('--sharing', choices=SHARING, default='copy', help='How --schedule inter workers get the model: own copies, forked copy-on-write, or memory-mapped')
+    metrics.add_arguments(parser)
     
     args = parser.parse_args()
+    recorder = None
+    if metrics.enabled(args):
+        recorder = metrics.start()
+        recorder.add_stage("imports", IMPORT_SECONDS)
+    
+    try:
+        text = read_input(args.text, args.file, args.framed)
+    except Exception as e:
+        source = "file" if args.file and not args.text else "input"
+        print(f"Error reading {source}: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    if is_blank(text):
+        print("Error: No input text provided", file=sys.stderr)
+        sys.exit(1)
     
-    result = process_document(args.text, args.max_length, args.min_length)
-    print(json.dumps(result, indent=2))
+    cache = None if args.no_cache else open_cache()
+    pool = setup_schedule(args.schedule, MODEL_NAME, args.processes, args.backend, args.sharing)
+    on_event = emit_record if args.stream else None
+    result = process_document(
+        as_text(text),
+        args.max_length,
+        args.min_length,
+        batch_size=args.batch_size,
+        overlap=args.overlap,
+        cache=cache,
+        pool=pool,
+        backend=args.backend,
+        on_event=on_event,
+        state_path=args.incremental,
+        fan_in=args.fan_in,
+        profile=args.profile
+    )
+    if pool is not None:
+        pool.close()
+    if recorder:
+        result = metrics.finish(args, recorder, result, {"script": "bart_summarizer", "backend": args.backend})
+    if args.stream:
+        emit_record({"type": "result", "result": result})
+    else:
+        print(json.dumps(result, indent=2))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for MindSpark AI Scripts
+Measures cold start, model load, latency, throughput and memory of
+simple_ai, local_ai and bart_summarizer on a deterministic corpus
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+
+from metrics import percentile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, "benchmark_fixtures")
+
+SIZES = {
+    "1k": 1024,
+    "10k": 10 * 1024,
+    "100k": 100 * 1024,
+    "1m": 1024 * 1024,
+    "5m": 5 * 1024 * 1024,
+}
+
+ENTRY_POINTS = {
+    "simple_ai": ["summarize", "questions", "analyze", "all"],
+    "local_ai": ["summarize", "questions", "analyze", "all"],
+    "bart_summarizer": ["all"],
+}
+
+# Metrics where a higher value is a regression, and where a lower one is
+HIGHER_IS_WORSE = ("latency_p50", "latency_p95", "peak_rss_mb", "cold_start_s", "model_load_s")
+LOWER_IS_WORSE = ("docs_per_s", "chars_per_s")
+
+VOCABULARY = (
+    "learning memory attention focus student teacher lesson chapter concept theory "
+    "energy system process method result evidence research practice question answer "
+    "brain habit routine task schedule break goal progress feedback reward example "
+    "problem solution structure pattern model data signal language reading writing "
+    "science history culture society nature plant animal water light cell change "
+    "important useful difficult simple clear strong early final common different "
+    "quickly slowly carefully often always usually rarely together between within"
+).split()
+
+CONNECTORS = ["is", "are", "can", "will", "helps", "allows", "shows", "requires", "improves", "explains"]
+
+def synthetic_text(size, seed=0):
+    """Deterministic pseudo-English text of roughly `size` characters"""
+    rng = random.Random(f"{seed}:{size}")
+    parts = []
+    length = 0
+    while length < size:
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            words = [rng.choice(VOCABULARY) for _ in range(rng.randint(3, 10))]
+            words.insert(rng.randint(1, len(words) - 1), rng.choice(CONNECTORS))
+            words += [rng.choice(VOCABULARY) for _ in range(rng.randint(2, 12))]
+            sentences.append(" ".join(words).capitalize() + rng.choice(".....!?"))
+        paragraph = " ".join(sentences)
+        parts.append(paragraph)
+        length += len(paragraph) + 2
+    text = "\n\n".join(parts)
+    # Cut at the last sentence end that fits the requested size
+    cut = max(text.rfind(mark, 0, size) for mark in ".!?")
+    return text[:cut + 1] if cut > 0 else text[:size]
+
+def build_corpus(sizes, seed=0):
+    """Synthetic documents for each size label plus the real-text fixtures"""
+    corpus = [{"name": f"synthetic-{label}", "size": label, "text": synthetic_text(SIZES[label], seed)}
+              for label in sizes]
+    if os.path.isdir(FIXTURE_DIR):
+        for name in sorted(os.listdir(FIXTURE_DIR)):
+            if name.endswith(".txt"):
+                with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as f:
+                    corpus.append({"name": f"fixture-{name[:-4]}", "size": "fixture", "text": f.read()})
+    return corpus
+
+def _load_entry(entry):
+    """Import an entry point and load its models, returning a task runner"""
+    sys.path.insert(0, SCRIPT_DIR)
+    if entry == "simple_ai":
+        import simple_ai
+        return lambda text, task: simple_ai.process_document(text, task)
+    if entry == "local_ai":
+        import local_ai
+        ai = local_ai.LocalAI()
+        ai.summarizer  # Loaded lazily; load it here so model_load_s covers it
+        return lambda text, task: ai.process_document(text, task)
+    if entry == "bart_summarizer":
+        import bart_summarizer
+        summarizer = bart_summarizer.setup_summarizer()
+        return lambda text, task: bart_summarizer.process_document(text, summarizer=summarizer)
+    raise ValueError(f"Unknown entry point: {entry}")
+
+def _bench_entry(entry, tasks, corpus, repeats, results):
+    """Child process body: load one entry point and time every task and document"""
+    from backends import peak_rss_mb
+
+    try:
+        start = time.perf_counter()
+        run = _load_entry(entry)
+        load_time = time.perf_counter() - start
+
+        rows = []
+        for task in tasks:
+            for doc in corpus:
+                latencies = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    run(doc["text"], task)
+                    latencies.append(time.perf_counter() - start)
+                total = sum(latencies)
+                rows.append({
+                    "entry": entry,
+                    "task": task,
+                    "document": doc["name"],
+                    "chars": len(doc["text"]),
+                    "repeats": repeats,
+                    "latency_p50": round(percentile(latencies, 50), 6),
+                    "latency_p95": round(percentile(latencies, 95), 6),
+                    "docs_per_s": round(repeats / total, 3) if total else None,
+                    "chars_per_s": round(repeats * len(doc["text"]) / total, 1) if total else None,
+                    "peak_rss_mb": peak_rss_mb()
+                })
+                print(f"⏱️ {entry} {task} {doc['name']}: p50 {rows[-1]['latency_p50']}s", file=sys.stderr)
+
+        results.put({"model_load_s": round(load_time, 4), "peak_rss_mb": peak_rss_mb(), "rows": rows})
+    except Exception as e:
+        results.put({"error": str(e), "rows": []})
+
+def cold_start(entry, task, text):
+    """Wall time of a fresh CLI process handling one small document"""
+    script = os.path.join(SCRIPT_DIR, f"{entry}.py")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        f.write(text)
+        path = f.name
+    try:
+        if entry == "bart_summarizer":
+            command = [sys.executable, script, "--text", text, "--no-cache"]
+        else:
+            command = [sys.executable, script, "--task", task, "--file", path, "--no-cache"]
+        start = time.perf_counter()
+        completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        return round(elapsed, 4) if completed.returncode == 0 else None
+    finally:
+        os.unlink(path)
+
+def run_benchmarks(entries, sizes, repeats=3, seed=0):
+    """Run every selected entry point in its own process and collect the report"""
+    corpus = build_corpus(sizes, seed)
+    context = multiprocessing.get_context("spawn")
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "seed": seed,
+            "repeats": repeats,
+            "documents": {doc["name"]: len(doc["text"]) for doc in corpus}
+        },
+        "entries": {},
+        "results": []
+    }
+
+    smallest = min(corpus, key=lambda doc: len(doc["text"]))["text"]
+    for entry in entries:
+        tasks = ENTRY_POINTS[entry]
+        print(f"🚀 Benchmarking {entry}...", file=sys.stderr)
+        results = context.Queue()
+        process = context.Process(target=_bench_entry, args=(entry, tasks, corpus, repeats, results))
+        process.start()
+        outcome = results.get()
+        process.join()
+
+        summary = {
+            "cold_start_s": cold_start(entry, tasks[0], smallest),
+            "model_load_s": outcome.get("model_load_s"),
+            "peak_rss_mb": outcome.get("peak_rss_mb")
+        }
+        if "error" in outcome:
+            summary["error"] = outcome["error"]
+        report["entries"][entry] = summary
+        report["results"].extend(outcome["rows"])
+
+    return report
+
+def _compare_metrics(label, current, baseline, threshold, regressions):
+    for metric in HIGHER_IS_WORSE + LOWER_IS_WORSE:
+        new, old = current.get(metric), baseline.get(metric)
+        if not new or not old:
+            continue
+        change = (new - old) / old
+        if metric in LOWER_IS_WORSE:
+            change = -change
+        if change > threshold:
+            regressions.append({
+                "where": label,
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": round(change, 3)
+            })
+
+def compare_reports(current, baseline, threshold=0.1):
+    """List metrics that got worse than the baseline by more than `threshold`"""
+    regressions = []
+    for entry, summary in current["entries"].items():
+        if entry in baseline.get("entries", {}):
+            _compare_metrics(entry, summary, baseline["entries"][entry], threshold, regressions)
+
+    previous = {(r["entry"], r["task"], r["document"]): r for r in baseline.get("results", [])}
+    for row in current["results"]:
+        key = (row["entry"], row["task"], row["document"])
+        if key in previous:
+            _compare_metrics("/".join(key), row, previous[key], threshold, regressions)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MindSpark AI scripts")
+    parser.add_argument("--entries", nargs="+", choices=list(ENTRY_POINTS), default=list(ENTRY_POINTS),
+                        help="Entry points to benchmark")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES),
+                        help="Synthetic document sizes")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per task and document")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus")
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", type=str, help="Saved report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change that counts as a regression (default 0.1 = 10%%)")
+    parser.add_argument("--dump-corpus", type=str, help="Write the corpus to this directory and exit")
+
+    args = parser.parse_args()
+
+    if args.dump_corpus:
+        os.makedirs(args.dump_corpus, exist_ok=True)
+        for doc in build_corpus(args.sizes, args.seed):
+            with open(os.path.join(args.dump_corpus, f"{doc['name']}.txt"), "w", encoding="utf-8") as f:
+                f.write(doc["text"])
+        return
+
+    report = run_benchmarks(args.entries, args.sizes, args.repeats, args.seed)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare_reports(report, baseline, args.threshold)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if report.get("regressions"):
+        print(f"❌ {len(report['regressions'])} regressions against baseline", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Bulk corpus processing for MindSpark
+Runs one task over a directory or JSONL manifest of documents with a single
+loaded model, appending JSONL results as they finish and resuming after a crash
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from local_ai import LocalAI, Worker, MODEL_NAME, MODEL_TASKS
+from summarization import DEFAULT_BATCH_SIZE, DEFAULT_FAN_IN
+from result_cache import open_cache, is_cacheable
+from parallel import setup_schedule, SCHEDULES, SHARING
+from backends import BACKENDS, DEFAULT_BACKEND
+
+TASKS = ("bart", "summarize", "questions", "analyze", "all", "route")
+PROGRESS_INTERVAL = 10.0  # Seconds between progress lines
+
+def scan_directory(directory, extensions=(".txt", ".md")):
+    """List (id, size, path, offset) for every text file under directory"""
+    documents = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(extensions):
+                path = os.path.join(root, name)
+                documents.append((os.path.relpath(path, directory), os.path.getsize(path), path, None))
+    return documents
+
+def scan_manifest(manifest):
+    """List (id, size, path, offset) for each manifest line
+
+    Lines are {"id": ..., "text": ...} or {"id": ..., "path": ...}, with
+    paths relative to the manifest. Inline texts are not kept: only the
+    line's byte offset is, and the text is re-read when it is processed.
+    """
+    base = os.path.dirname(os.path.abspath(manifest))
+    documents = []
+    offset = 0
+    with open(manifest, 'rb') as f:
+        for line_number, line in enumerate(f, 1):
+            start = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                print(f"Skipping manifest line {line_number}: {e}", file=sys.stderr)
+                continue
+            doc_id = str(entry.get("id", line_number))
+            if "path" in entry:
+                path = os.path.join(base, entry["path"])
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                documents.append((doc_id, size, path, None))
+            elif "text" in entry:
+                documents.append((doc_id, len(line), manifest, start))
+            else:
+                print(f"Skipping manifest line {line_number}: no text or path", file=sys.stderr)
+    return documents
+
+def read_document(document):
+    _, _, path, offset = document
+    if offset is None:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.readline())["text"]
+
+def succeeded(record):
+    """Whether an output record is a finished result (error results count as failures, as in result_cache)"""
+    return record.get("type") == "result" and is_cacheable(record.get("result"))
+
+def load_checkpoint(output, task=None, params=None):
+    """Ids already processed successfully, with this task and params, according to an existing output file
+
+    A partial last line left by a crash is cut off so appending stays valid JSONL.
+    Results from a run with other settings don't count, so those documents are redone.
+    """
+    done = set()
+    other_settings = 0
+    if not os.path.exists(output):
+        return done
+    with open(output, 'rb+') as f:
+        valid = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            valid += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if succeeded(record):
+                if record.get("task") == task and record.get("params") == (params or {}):
+                    done.add(str(record.get("id")))
+                else:
+                    other_settings += 1
+        f.truncate(valid)
+    if other_settings:
+        print(f"♻️ Ignoring {other_settings} results in {output} made with a different task or parameters", file=sys.stderr)
+    return done
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+class Progress:
+    """Counts finished documents and prints throughput and ETA to stderr"""
+
+    def __init__(self, total, total_bytes, skipped=0):
+        self.total = total
+        self.total_bytes = total_bytes
+        self.skipped = skipped
+        self.processed = 0
+        self.failed = 0
+        self.bytes = 0
+        self.started = time.time()
+        self.last_report = self.started
+
+    def update(self, size, ok):
+        self.processed += 1
+        self.bytes += size
+        if not ok:
+            self.failed += 1
+        if time.time() - self.last_report >= PROGRESS_INTERVAL:
+            self.report()
+
+    def report(self):
+        self.last_report = time.time()
+        elapsed = max(self.last_report - self.started, 1e-9)
+        rate = self.bytes / elapsed
+        eta = (self.total_bytes - self.bytes) / rate if rate else 0
+        print(f"📚 {self.processed}/{self.total} documents ({100 * self.processed / max(self.total, 1):.1f}%), "
+              f"{self.failed} failed, {60 * self.processed / elapsed:.1f} docs/min, "
+              f"{rate / 1e6:.2f} MB/s, ETA {format_duration(eta)}", file=sys.stderr)
+
+    def summary(self):
+        elapsed = max(time.time() - self.started, 1e-9)
+        return {
+            "documents": self.total + self.skipped,
+            "skipped": self.skipped,
+            "processed": self.processed,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "elapsed": round(elapsed, 3),
+            "docs_per_min": round(60 * self.processed / elapsed, 2),
+            "mb_per_s": round(self.bytes / elapsed / 1e6, 4)
+        }
+
+def run_bulk(worker, documents, output, task="bart", params=None, max_in_flight=8, with_metrics=False):
+    """Process every document not already in `output`, appending one record per document
+
+    Documents go largest first so the longest jobs start early instead of
+    leaving one worker busy at the end of the run. At most `max_in_flight`
+    documents are read and queued at a time.
+    """
+    done = load_checkpoint(output, task, params)
+    queue = sorted((d for d in documents if d[0] not in done), key=lambda d: d[1], reverse=True)
+    skipped = len(documents) - len(queue)
+    if skipped:
+        print(f"♻️ Resuming: {skipped} documents already in {output}", file=sys.stderr)
+    progress = Progress(len(queue), sum(d[1] for d in queue), skipped)
+
+    def process(document):
+        try:
+            text = read_document(document)
+        except (OSError, ValueError, KeyError) as e:
+            return document, {"id": document[0], "type": "error", "error": f"Could not read document: {e}"}
+        request = {"id": document[0], "task": task, "text": text, "params": params or {}}
+        if with_metrics:
+            request["metrics"] = True
+        record = worker.handle(request)
+        if record.get("type") == "result":
+            record["params"] = request["params"]  # Lets a resumed run tell its own results apart
+        return document, record
+
+    with open(output, 'a', encoding='utf-8') as out:
+        def finish(futures):
+            for future in futures:
+                document, record = future.result()
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                progress.update(document[1], succeeded(record))
+
+        in_flight = set()
+        try:
+            for document in queue:
+                if len(in_flight) >= max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    finish(finished)
+                in_flight.add(worker.executor.submit(process, document))
+            finish(wait(in_flight).done)
+        except KeyboardInterrupt:
+            for future in in_flight:
+                future.cancel()
+            print(f"Interrupted; rerun with --output {output} to resume", file=sys.stderr)
+            raise
+
+    progress.report()
+    return progress.summary()
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk corpus processing for MindSpark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", type=str, help="Directory of .txt/.md documents to process")
+    source.add_argument("--manifest", type=str,
+                        help="JSONL manifest with one {\"id\", \"text\"} or {\"id\", \"path\"} per line")
+    parser.add_argument("--output", type=str, required=True,
+                        help="JSONL results file, appended to and used as the resume checkpoint")
+    parser.add_argument("--task", choices=TASKS, default="bart", help="Task to run on every document")
+    parser.add_argument("--max-length", type=int, default=150, help="Maximum summary length")
+    parser.add_argument("--min-length", type=int, default=50, help="Minimum summary length")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Documents processed concurrently (model calls still share one model)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Number of chunks per summarization batch")
+    parser.add_argument("--fan-in", type=int, default=DEFAULT_FAN_IN,
+                        help="Chunk summaries merged per reduce step")
+    parser.add_argument("--no-cache", action="store_true", help="Skip the persistent result cache")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Inference backend for the summarization model")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="intra",
+                        help="intra: all cores per generate call; inter: parallel worker processes")
+    parser.add_argument("--processes", type=int,
+                        help="Worker processes for --schedule inter (default: cores / 4)")
+    parser.add_argument("--sharing", choices=SHARING, default="copy",
+                        help="How --schedule inter workers get the model: own copies, forked copy-on-write, or memory-mapped")
+    parser.add_argument("--metrics", action="store_true", help="Attach per-stage metrics to every record")
+
+    args = parser.parse_args()
+
+    try:
+        documents = scan_directory(args.dir) if args.dir else scan_manifest(args.manifest)
+    except OSError as e:
+        print(f"Error reading corpus: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not documents:
+        print("Error: No documents found", file=sys.stderr)
+        sys.exit(1)
+    print(f"📂 {len(documents)} documents, {sum(d[1] for d in documents) / 1e6:.1f} MB", file=sys.stderr)
+
+    cache = None if args.no_cache else open_cache()
+    pool = None
+    if args.task in MODEL_TASKS:
+        pool = setup_schedule(args.schedule, MODEL_NAME, args.processes, args.backend, args.sharing)
+    ai = LocalAI(batch_size=args.batch_size, cache=cache, pool=pool, backend=args.backend, fan_in=args.fan_in)
+    worker = Worker(ai, max_workers=args.workers)
+    if args.task in MODEL_TASKS:
+        ai.summarizer  # Load the model once, before the clock starts
+
+    params = {"max_length": args.max_length, "min_length": args.min_length}
+    try:
+        summary = run_bulk(worker, documents, args.output, args.task, params,
+                           max_in_flight=2 * args.workers, with_metrics=args.metrics)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        worker.executor.shutdown(wait=False)
+        if pool is not None:
+            pool.close()
+
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
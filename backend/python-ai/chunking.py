@@ -0,0 +1,137 @@
+"""
+Token-aware text chunking for MindSpark summarizers
+Packs whole sentences into chunks that fit the model's token limit
+"""
+
+import re
+import sys
+import zlib
+
+import metrics
+
+# BART-large-cnn accepts 1024 positions including <s> and </s>
+DEFAULT_MAX_TOKENS = 1022
+
+# About one sentence in ANCHOR_MODULUS is a content-defined chunk boundary
+ANCHOR_MODULUS = 4
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n{2,}')
+
+def split_sentences(text):
+    """Split text into sentences, keeping their closing punctuation"""
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+def token_budget(tokenizer, max_tokens=None):
+    """Largest number of content tokens a single model call can take"""
+    if max_tokens:
+        return max_tokens
+    if tokenizer is not None:
+        limit = getattr(tokenizer, 'model_max_length', None)
+        # Tokenizers without a configured limit report a huge sentinel value
+        if limit and limit < 100000:
+            return limit - tokenizer.num_special_tokens_to_add()
+    return DEFAULT_MAX_TOKENS
+
+def count_tokens(texts, tokenizer=None):
+    """Token counts for a list of texts, estimated from words without a tokenizer"""
+    if not texts:
+        return []
+    if tokenizer is None:
+        return [int(len(text.split()) * 1.3) + 1 for text in texts]
+    encoded = tokenizer(texts, add_special_tokens=False)['input_ids']
+    return [len(ids) for ids in encoded]
+
+def split_long_sentence(sentence, budget, tokenizer=None):
+    """Break a sentence that alone exceeds the budget into budget-sized pieces"""
+    if tokenizer is None:
+        words = sentence.split()
+        step = max(1, int(budget / 1.3) - 1)
+        return [' '.join(words[i:i + step]) for i in range(0, len(words), step)]
+    ids = tokenizer(sentence, add_special_tokens=False)['input_ids']
+    return [
+        tokenizer.decode(ids[i:i + budget], skip_special_tokens=True).strip()
+        for i in range(0, len(ids), budget)
+    ]
+
+def is_anchor(sentence):
+    """Content-defined boundary test, independent of the sentence's position"""
+    return zlib.crc32(sentence.encode('utf-8')) % ANCHOR_MODULUS == 0
+
+def chunk_text(text, tokenizer=None, max_tokens=None, overlap=0, anchored=False):
+    """Pack whole sentences into chunks of at most the model's token budget
+
+    `overlap` is a token allowance of trailing sentences repeated at the
+    start of the next chunk. With `anchored`, a chunk that is at least half
+    full also ends after any anchor sentence, so an edit only moves the
+    boundaries up to the next anchor and later chunks stay identical.
+    Returns (chunks, stats).
+    """
+    budget = token_budget(tokenizer, max_tokens)
+    overlap = max(0, min(overlap, budget // 2))
+
+    with metrics.stage("tokenization"):
+        raw = split_sentences(text)
+        sentences = []
+        for sentence, tokens in zip(raw, count_tokens(raw, tokenizer)):
+            if tokens > budget:
+                pieces = split_long_sentence(sentence, budget, tokenizer)
+                sentences.extend(zip(pieces, count_tokens(pieces, tokenizer)))
+            else:
+                sentences.append((sentence, tokens))
+
+    chunks = []
+    chunk_tokens = []
+    current = []
+    current_tokens = 0
+    fresh = False  # Whether `current` holds anything beyond the carried overlap
+    for sentence, tokens in sentences:
+        if fresh and current_tokens + tokens > budget:
+            chunks.append(' '.join(s for s, _ in current))
+            chunk_tokens.append(current_tokens)
+            current, current_tokens = _overlap_tail(current, overlap, budget - tokens)
+        current.append((sentence, tokens))
+        current_tokens += tokens
+        fresh = True
+        if anchored and current_tokens >= budget // 2 and is_anchor(sentence):
+            chunks.append(' '.join(s for s, _ in current))
+            chunk_tokens.append(current_tokens)
+            current, current_tokens = _overlap_tail(current, overlap, budget)
+            fresh = False
+
+    if fresh:
+        chunks.append(' '.join(s for s, _ in current))
+        chunk_tokens.append(current_tokens)
+
+    metrics.count("chunks", len(chunks))
+    metrics.count("tokens_in", sum(chunk_tokens))
+    stats = {
+        "chunks": len(chunks),
+        "sentences": len(sentences),
+        "total_tokens": sum(chunk_tokens),
+        "max_chunk_tokens": max(chunk_tokens) if chunk_tokens else 0,
+        "avg_chunk_tokens": round(sum(chunk_tokens) / len(chunk_tokens), 1) if chunk_tokens else 0,
+        "token_budget": budget,
+        "overlap_tokens": overlap,
+        "tokenizer": getattr(tokenizer, 'name_or_path', None) or "estimate"
+    }
+    return chunks, stats
+
+def _overlap_tail(sentences, overlap, room):
+    """Trailing sentences (up to `overlap` tokens) to carry into the next chunk"""
+    tail = []
+    tokens = 0
+    limit = min(overlap, room)
+    for sentence, count in reversed(sentences):
+        if tokens + count > limit:
+            break
+        tail.insert(0, (sentence, count))
+        tokens += count
+    return tail, tokens
+
+def log_stats(stats):
+    """Report chunking stats on stderr"""
+    print(
+        f"📐 {stats['chunks']} chunks, {stats['total_tokens']} tokens "
+        f"(max {stats['max_chunk_tokens']}/{stats['token_budget']}, {stats['tokenizer']})",
+        file=sys.stderr
+    )
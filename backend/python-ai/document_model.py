@@ -0,0 +1,105 @@
+"""
+Shared document model for MindSpark text analysis
+Segments a document once so every task can reuse sentences, words and tokens
+"""
+
+import re
+
+SENTENCE_PATTERN = re.compile(r'[^.!?]+')
+SENTENCE_END = re.compile(r'[.!?]+')
+STREAM_BLOCK_SIZE = 1 << 16
+# Text without any sentence terminator is cut here so streaming stays bounded
+MAX_SENTENCE_CHARS = 1 << 20
+WORD_PATTERN = re.compile(r'\S+')
+TOKEN_STRIP = '.,!?;:"\'()[]{}'
+
+class Document:
+    """Sentences, word spans and lowercase tokens of a text, built in one pass each
+
+    `sentences` matches `[s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]`
+    and `words` matches `text.split()`, with character offsets kept for both.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.sentences = []
+        self.sentence_spans = []
+        self.sentence_word_counts = []
+        for match in SENTENCE_PATTERN.finditer(text):
+            segment = match.group()
+            sentence = segment.strip()
+            if not sentence:
+                continue
+            start = match.start() + (len(segment) - len(segment.lstrip()))
+            self.sentences.append(sentence)
+            self.sentence_spans.append((start, start + len(sentence)))
+            self.sentence_word_counts.append(len(sentence.split()))
+
+        self.word_spans = [match.span() for match in WORD_PATTERN.finditer(text)]
+        self._tokens = None
+        self._token_set = None
+
+    @property
+    def word_count(self):
+        return len(self.word_spans)
+
+    @property
+    def sentence_count(self):
+        return len(self.sentences)
+
+    @property
+    def words(self):
+        return [self.text[start:end] for start, end in self.word_spans]
+
+    @property
+    def tokens(self):
+        """Lowercase words with surrounding punctuation removed"""
+        if self._tokens is None:
+            tokens = (self.text[start:end].lower().strip(TOKEN_STRIP) for start, end in self.word_spans)
+            self._tokens = [token for token in tokens if token]
+        return self._tokens
+
+    @property
+    def token_set(self):
+        if self._token_set is None:
+            self._token_set = set(self.tokens)
+        return self._token_set
+
+def as_document(text):
+    """Accept either raw text or an already built Document"""
+    return text if isinstance(text, Document) else Document(text)
+
+def stream_sentences(source, block_size=STREAM_BLOCK_SIZE):
+    """Yield stripped sentences from a string, Document or text file object
+
+    Sentences are split exactly like Document.sentences, but file objects
+    are read block by block so memory stays bounded for any input size.
+    """
+    if isinstance(source, Document):
+        yield from source.sentences
+        return
+    if isinstance(source, str):
+        for match in SENTENCE_PATTERN.finditer(source):
+            sentence = match.group().strip()
+            if sentence:
+                yield sentence
+        return
+
+    pending = ''
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        parts = SENTENCE_END.split(pending + block)
+        # The last part may continue in the next block
+        pending = parts.pop()
+        if len(pending) > MAX_SENTENCE_CHARS:
+            parts.append(pending)
+            pending = ''
+        for part in parts:
+            sentence = part.strip()
+            if sentence:
+                yield sentence
+    sentence = pending.strip()
+    if sentence:
+        yield sentence
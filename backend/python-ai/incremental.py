@@ -0,0 +1,62 @@
+"""
+Incremental re-summarization state for MindSpark documents
+Remembers per-chunk fingerprints and summaries so edits only re-run changed chunks
+"""
+
+import os
+import sys
+import json
+import hashlib
+
+STATE_VERSION = 1
+
+def fingerprint(chunk):
+    """Content fingerprint of a chunk, insensitive to whitespace changes"""
+    return hashlib.sha256(' '.join(chunk.split()).encode('utf-8')).hexdigest()[:32]
+
+def load_state(path, params):
+    """Fingerprint -> summary map from a previous run with the same parameters
+
+    A missing, unreadable or mismatched state file simply means nothing
+    can be reused.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable incremental state {path}: {e}", file=sys.stderr)
+        return {}
+    if state.get("version") != STATE_VERSION or state.get("params") != params:
+        return {}
+    return {chunk["fingerprint"]: chunk["summary"] for chunk in state.get("chunks", [])}
+
+def save_state(path, params, fingerprints, summaries):
+    """Atomically replace the state file with this run's chunks"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    state = {
+        "version": STATE_VERSION,
+        "params": params,
+        "chunks": [
+            {"fingerprint": fp, "summary": summary}
+            for fp, summary in zip(fingerprints, summaries)
+        ]
+    }
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+def plan_chunks(chunks, previous):
+    """Split chunks into reusable summaries and the indices that need the model
+
+    Returns (fingerprints, summaries, pending) where `summaries` holds the
+    reused summary or None and `pending` lists indices still to summarize.
+    """
+    fingerprints = [fingerprint(chunk) for chunk in chunks]
+    summaries = [previous.get(fp) for fp in fingerprints]
+    pending = [i for i, summary in enumerate(summaries) if summary is None]
+    return fingerprints, summaries, pending
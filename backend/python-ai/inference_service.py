@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Micro-batching inference service for MindSpark
+Serves summarization requests over a local socket, gathering chunks from
+concurrent requests into shared batched generate calls
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from chunking import chunk_text, count_tokens
+from summarization import summarize_chunks, pack_merges, DEFAULT_BATCH_SIZE, DEFAULT_FAN_IN
+from decoding import PROFILES
+from backends import load_summarizer, BACKENDS, DEFAULT_BACKEND
+from metrics import percentile
+
+MODEL_NAME = "facebook/bart-large-cnn"
+DEFAULT_WINDOW_MS = 10.0
+DEFAULT_MAX_QUEUE = 256  # Queued chunks before new requests are turned away
+DEFAULT_TIMEOUT = 30.0
+LATENCY_SAMPLES = 1000
+
+class MicroBatcher:
+    """Queue of chunks from concurrent requests, drained in micro-batches
+
+    The scheduler takes the first waiting chunk, keeps collecting for up to
+    `window` seconds or until `max_batch_size` chunks, then groups them by
+    generation settings (lengths and decoding profile) and runs each group
+    as one batched generate call (sorted by length by summarize_chunks).
+    All tokenizer and model work runs on a single thread, so the pipeline
+    is never used concurrently.
+    """
+
+    def __init__(self, summarizer, max_batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW_MS / 1000,
+                 max_queue=DEFAULT_MAX_QUEUE, fan_in=DEFAULT_FAN_IN, timeout=DEFAULT_TIMEOUT):
+        self.summarizer = summarizer
+        self.tokenizer = getattr(summarizer, 'tokenizer', None)
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window
+        self.max_queue = max_queue
+        self.fan_in = max(2, fan_in)
+        self.timeout = timeout
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.counts = Counter()
+        self.batch_sizes = Counter()
+        self.max_depth = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.started_at = time.time()
+
+    def enqueue(self, text, max_length, min_length, profile=None):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((future, text, max_length, min_length, profile))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return future
+
+    async def run(self):
+        """Scheduler loop: collect one micro-batch, run it, repeat"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            self._drain(batch)
+            if len(batch) < self.max_batch_size and deadline > loop.time():
+                await asyncio.sleep(deadline - loop.time())
+                self._drain(batch)
+            # Chunks of requests that timed out in the queue are dropped
+            batch = [item for item in batch if not item[0].done()]
+            if batch:
+                await self._run_batch(batch)
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        groups = {}
+        for item in batch:
+            groups.setdefault(item[2:], []).append(item)
+        for (max_length, min_length, profile), items in groups.items():
+            self.counts["batches"] += 1
+            self.batch_sizes[len(items)] += 1
+            try:
+                summaries = await loop.run_in_executor(
+                    self.executor,
+                    lambda: summarize_chunks(
+                        self.summarizer,
+                        [item[1] for item in items],
+                        max_length=max_length,
+                        min_length=min_length,
+                        batch_size=len(items),
+                        profile=profile
+                    )
+                )
+            except Exception as e:
+                for item in items:
+                    if not item[0].done():
+                        item[0].set_exception(e)
+                continue
+            for item, summary in zip(items, summaries):
+                if not item[0].done():
+                    item[0].set_result(summary)
+
+    async def summarize(self, text, max_length=150, min_length=50, profile=None):
+        """Summarize one request: chunk it, batch its chunks, then reduce their summaries"""
+        loop = asyncio.get_running_loop()
+        chunks, stats = await loop.run_in_executor(self.executor, chunk_text, text, self.tokenizer)
+        if not chunks:
+            raise ValueError("No input text provided")
+        # A document larger than the whole queue is still admitted once the queue is empty
+        if self.queue.qsize() and self.queue.qsize() + len(chunks) > self.max_queue:
+            raise OverflowError(f"Server busy: {self.queue.qsize()} chunks queued")
+        summaries = await asyncio.gather(*(self.enqueue(chunk, max_length, min_length, profile) for chunk in chunks))
+
+        async def merge(group):
+            if len(group) == 1:
+                return group[0]  # A lone summary moves up unchanged, as in ReduceTree
+            return await self.enqueue(' '.join(group), max_length, min_length, profile)
+
+        # Reduce level by level, packing merges like ReduceTree so a level's merges batch together
+        while len(summaries) > 1:
+            groups = pack_merges(summaries, count_tokens(summaries, self.tokenizer), self.fan_in, stats["token_budget"])
+            summaries = await asyncio.gather(*(merge(group) for group in groups))
+        return summaries[0], len(chunks)
+
+    async def handle(self, request):
+        """Process one decoded request and return the response record"""
+        request_id = request.get("id")
+        task = request.get("task", "summarize")
+        if task == "stats":
+            return dict(self.stats(), id=request_id, type="stats")
+        if task == "health":
+            return {"id": request_id, "type": "health", "status": "ready", "pid": os.getpid(),
+                    "uptime": round(time.time() - self.started_at, 3)}
+        if task != "summarize":
+            return {"id": request_id, "type": "error", "error": f"Unknown task: {task}"}
+
+        params = request.get("params") or {}
+        profile = params.get("profile")
+        if profile and profile not in PROFILES:
+            return {"id": request_id, "type": "error", "error": f"Unknown decoding profile: {profile}"}
+        start = time.perf_counter()
+        try:
+            summary, chunk_count = await asyncio.wait_for(
+                self.summarize(str(request.get("text", "")), params.get("max_length", 150), params.get("min_length", 50), profile),
+                params.get("timeout", self.timeout)
+            )
+        except asyncio.TimeoutError:
+            self.counts["timed_out"] += 1
+            return {"id": request_id, "type": "error", "error": "Request timed out"}
+        except OverflowError as e:
+            self.counts["rejected"] += 1
+            return {"id": request_id, "type": "error", "error": str(e), "retry": True}
+        except Exception as e:
+            self.counts["failed"] += 1
+            return {"id": request_id, "type": "error", "error": str(e)}
+        elapsed = time.perf_counter() - start
+        self.counts["completed"] += 1
+        self.latencies.append(elapsed)
+        return {"id": request_id, "type": "result", "task": task, "result": summary,
+                "chunkCount": chunk_count, "elapsed": round(elapsed, 3)}
+
+    def stats(self):
+        """Queue depth, batch size and latency metrics"""
+        batched = sum(size * count for size, count in self.batch_sizes.items())
+        latencies = list(self.latencies)
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "completed": self.counts["completed"],
+            "rejected": self.counts["rejected"],
+            "timed_out": self.counts["timed_out"],
+            "failed": self.counts["failed"],
+            "batches": self.counts["batches"],
+            "avg_batch_size": round(batched / self.counts["batches"], 2) if self.counts["batches"] else 0,
+            "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "latency_p50": round(percentile(latencies, 50), 4) if latencies else None,
+            "latency_p95": round(percentile(latencies, 95), 4) if latencies else None
+        }
+
+async def serve(batcher, socket_path):
+    """Serve newline-delimited JSON requests on a Unix socket, answering each as it finishes"""
+    scheduler = asyncio.ensure_future(batcher.run())
+
+    async def on_connection(reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request):
+            response = await batcher.handle(request)
+            async with write_lock:
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                await writer.drain()
+
+        async for line in reader:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                request = None
+                async with write_lock:
+                    writer.write((json.dumps({"id": None, "type": "error", "error": f"Invalid JSON request: {e}"}) + "\n").encode("utf-8"))
+            if request is not None:
+                task = asyncio.ensure_future(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        writer.close()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(on_connection, path=socket_path, limit=1 << 26)
+    print(f"Listening on {socket_path}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        scheduler.cancel()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+async def run_client(socket_path, text, requests=16, concurrency=8, max_length=150, min_length=50, timeout=DEFAULT_TIMEOUT):
+    """Fire concurrent requests at a running service and report latency and server stats"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(request):
+        reader, writer = await asyncio.open_unix_connection(socket_path, limit=1 << 26)
+        writer.write((json.dumps(request) + "\n").encode("utf-8"))
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        writer.close()
+        return response
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call({"id": i, "task": "summarize", "text": text,
+                                   "params": {"max_length": max_length, "min_length": min_length, "timeout": timeout}})
+            return response, time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = [seconds for response, seconds in results if response.get("type") == "result"]
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": Counter(response.get("error") for response, _ in results if response.get("type") != "result"),
+        "requests_per_s": round(requests / elapsed, 2),
+        "latency_p50": round(percentile(latencies, 50), 4) if latencies else None,
+        "latency_p95": round(percentile(latencies, 95), 4) if latencies else None,
+        "server": await call({"id": "stats", "task": "stats"})
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching summarization service for MindSpark")
+    parser.add_argument("--socket", type=str, required=True, help="Unix socket path to serve on or connect to")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Inference backend for the summarization model")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Most chunks in one generate call")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS,
+                        help="How long to wait for more chunks before running a batch")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="Queued chunks beyond which new requests are rejected (unless the queue is empty)")
+    parser.add_argument("--fan-in", type=int, default=DEFAULT_FAN_IN,
+                        help="Chunk summaries merged per reduce step")
+    parser.add_argument("--client", action="store_true",
+                        help="Send test requests to a running service instead of serving")
+    parser.add_argument("--file", type=str, help="Document to send (with --client)")
+    parser.add_argument("--requests", type=int, default=16, help="Requests to send (with --client)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight (with --client)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-request timeout in seconds: the service's default, or sent with each --client request")
+
+    args = parser.parse_args()
+
+    if args.client:
+        if not args.file:
+            print("Error: --client needs --file", file=sys.stderr)
+            sys.exit(1)
+        with open(args.file, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        report = asyncio.run(run_client(args.socket, text, args.requests, args.concurrency, timeout=args.timeout))
+        print(json.dumps(report, indent=2))
+        return
+
+    try:
+        summarizer = load_summarizer(MODEL_NAME, args.backend)
+    except Exception as e:
+        print(f"Error initializing AI models: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    async def start():
+        batcher = MicroBatcher(summarizer, args.max_batch_size, args.window_ms / 1000, args.max_queue, args.fan_in, args.timeout)
+        await serve(batcher, args.socket)
+
+    try:
+        asyncio.run(start())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Streaming term and phrase counting for MindSpark
+Bounded-memory heavy hitters of a document's words and multi-word phrases
+"""
+
+import heapq
+from operator import itemgetter
+
+from lexicon import tokenize
+from document_model import stream_sentences
+
+DEFAULT_CAPACITY = 512
+MAX_PHRASE_WORDS = 3
+MIN_PHRASE_COUNT = 2
+
+class HeavyHitters:
+    """The most frequent items of a stream, counted in bounded memory
+
+    A batched Space-Saving table: items are counted exactly while they are
+    in it, and when it reaches twice `capacity` only the `capacity` highest
+    counts are kept. A later newcomer starts from the highest count dropped
+    so far (`floor`), since it may have been seen that often before, so
+    counts are overestimated by at most their recorded error, never under.
+    Any item occurring more than len(stream) / capacity times is kept.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+
+    def add(self, item):
+        counts = self.counts
+        if item in counts:
+            counts[item] += 1
+            return
+        counts[item] = self.floor + 1
+        if self.floor:
+            self.errors[item] = self.floor
+        if len(counts) >= 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        ranked = sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+        self.floor = max(self.floor, ranked[self.capacity][1])
+        self.counts = dict(ranked[:self.capacity])
+        self.errors = {item: error for item, error in self.errors.items() if item in self.counts}
+
+    def guaranteed(self, item):
+        """How many times item was certainly seen"""
+        return self.counts.get(item, 0) - self.errors.get(item, 0)
+
+    def top(self, k):
+        """The k highest (item, count) pairs; ties keep first-seen order"""
+        return heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
+
+class TermCounter:
+    """Unigram and phrase heavy hitters of one document
+
+    Content words are tokens longer than three letters that are not
+    stopwords; phrases are runs of two to MAX_PHRASE_WORDS consecutive
+    content words within a sentence.
+    """
+
+    def __init__(self, stopwords=(), capacity=DEFAULT_CAPACITY):
+        self.stopwords = frozenset(stopwords)
+        self.words = HeavyHitters(capacity)
+        self.phrases = HeavyHitters(capacity)
+
+    def add_sentence(self, sentence):
+        run = []
+        for token in tokenize(sentence):
+            if len(token) > 3 and token.isalpha() and token not in self.stopwords:
+                self.words.add(token)
+                run.append(token)
+                for n in range(2, min(len(run), MAX_PHRASE_WORDS) + 1):
+                    self.phrases.add(' '.join(run[-n:]))
+            else:
+                run = []
+
+    def term_weights(self, k=50):
+        """Counts of the k most frequent content words"""
+        return dict(self.words.top(k))
+
+    def concepts(self, k=4):
+        """Top k words and recurring phrases, without near-duplicates
+
+        A phrase scores its count times its length, so a phrase that occurs
+        about as often as its words replaces them.
+        """
+        ranked = [(count, word) for word, count in self.words.top(4 * k)]
+        ranked += [
+            (count * len(phrase.split()), phrase)
+            for phrase, count in self.phrases.top(4 * k)
+            if self.phrases.guaranteed(phrase) >= MIN_PHRASE_COUNT
+        ]
+        ranked.sort(key=lambda entry: entry[0], reverse=True)
+
+        chosen = []
+        for _, term in ranked:
+            padded = f" {term} "
+            if any(f" {other} " in padded or padded in f" {other} " for other in chosen):
+                continue
+            chosen.append(term)
+            if len(chosen) == k:
+                break
+        return chosen
+
+def count_terms(source, stopwords=(), capacity=DEFAULT_CAPACITY):
+    """Stream a string, Document or text file's sentences into a TermCounter"""
+    counter = TermCounter(stopwords, capacity)
+    for sentence in stream_sentences(source):
+        counter.add_sentence(sentence)
+    return counter
@@ -0,0 +1,160 @@
+"""
+Word-list matching for MindSpark text analysis
+Weighted single- and multi-word lexicons matched on whole tokens in one pass
+"""
+
+import os
+import sys
+
+from document_model import Document, TOKEN_STRIP
+
+LEXICON_DIR_ENV = "MINDSPARK_LEXICONS"
+
+def tokenize(text):
+    """Lowercase whitespace-separated words with surrounding punctuation removed, like Document.tokens"""
+    tokens = (word.lower().strip(TOKEN_STRIP) for word in text.split())
+    return [token for token in tokens if token]
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+class Lexicon:
+    """Weighted terms compiled into a token trie
+
+    A term is one or more words; each maps to a label (e.g. "positive")
+    and a weight. Matching walks the text's tokens once, taking the
+    longest term starting at each token and skipping past it, so terms only
+    match whole words ("bad" never matches "badge") and a phrase such as
+    "not good" wins over the "good" inside it. Cost depends on the text
+    length and the longest term, not on how many terms there are.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+        self.longest = 0
+
+    def add(self, term, label=None, weight=1.0):
+        tokens = tokenize(term)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if None not in node:
+            self.size += 1
+        node[None] = (label, float(weight))
+        self.longest = max(self.longest, len(tokens))
+
+    def update(self, words, label=None, weight=1.0):
+        for word in words:
+            self.add(word, label, weight)
+        return self
+
+    def load(self, path, label=None):
+        """Add terms from a file with one `term[<TAB>label][<TAB>weight]` per line
+
+        Blank lines and lines starting with # are skipped. Without a label
+        column the `label` argument is used; a numeric second column is
+        read as the weight.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.rstrip('\n')
+                if not line.strip() or line.lstrip().startswith('#'):
+                    continue
+                fields = line.split('\t')
+                term, term_label, weight = fields[0], label, "1"
+                if len(fields) == 2:
+                    if _is_number(fields[1]):
+                        weight = fields[1]
+                    else:
+                        term_label = fields[1]
+                elif len(fields) >= 3:
+                    term_label, weight = fields[1], fields[2]
+                if not _is_number(weight):
+                    print(f"Skipping {path}:{line_number}: bad weight {weight!r}", file=sys.stderr)
+                    continue
+                self.add(term, term_label, float(weight))
+        return self
+
+    def matches(self, text):
+        """Yield (start, end, label, weight) for each match, in token positions
+
+        `text` may be a string, a Document or an already tokenized list.
+        """
+        if isinstance(text, Document):
+            tokens = text.tokens
+        elif isinstance(text, str):
+            tokens = tokenize(text)
+        else:
+            tokens = text
+        root = self.root
+        i = 0
+        n = len(tokens)
+        while i < n:
+            node = root.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+            best = (i + 1, node[None]) if None in node else None
+            j = i + 1
+            while j < n and j - i < self.longest:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if None in node:
+                    best = (j, node[None])
+            if best is None:
+                i += 1
+                continue
+            end, (label, weight) = best
+            yield i, end, label, weight
+            i = end
+
+    def scores(self, text):
+        """Total weight of the matches for each label"""
+        totals = {}
+        for _, _, label, weight in self.matches(text):
+            totals[label] = totals.get(label, 0.0) + weight
+        return totals
+
+    def contains(self, text):
+        return next(self.matches(text), None) is not None
+
+    def __len__(self):
+        return self.size
+
+def load_lexicon(name, builtin=None, label=None):
+    """Build a lexicon from built-in word lists plus `<name>.tsv` under $MINDSPARK_LEXICONS
+
+    `builtin` maps labels to lists of terms of weight 1. Callers keep the
+    result at module level so it is compiled once per process.
+    """
+    lexicon = Lexicon()
+    for term_label, words in (builtin or {}).items():
+        lexicon.update(words, term_label)
+    directory = os.environ.get(LEXICON_DIR_ENV)
+    if directory:
+        path = os.path.join(os.path.expanduser(directory), f"{name}.tsv")
+        if os.path.exists(path):
+            try:
+                lexicon.load(path, label)
+            except OSError as e:
+                print(f"Could not read lexicon {path}: {e}", file=sys.stderr)
+    return lexicon
+
+def sentiment_label(scores):
+    """positive, negative or neutral from Lexicon.scores of a sentiment lexicon"""
+    positive = scores.get("positive", 0.0)
+    negative = scores.get("negative", 0.0)
+    if positive > negative:
+        return "positive"
+    if negative > positive:
+        return "negative"
+    return "neutral"
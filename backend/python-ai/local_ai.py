@@ -5,74 +5,123 @@ Provides text summarization, question generation, and content analysis
 using HuggingFace Transformers
 """
 
+import time
+IMPORT_STARTED = time.perf_counter()
+
+import os
 import sys
 import json
 import argparse
-from transformers import pipeline
+import threading
+from concurrent.futures import wait
 import warnings
+import metrics
+from summarization import iter_chunk_summaries, record_outputs, ReduceTree, DEFAULT_BATCH_SIZE, DEFAULT_FAN_IN
+from chunking import chunk_text, log_stats
+from result_cache import open_cache, cached_call
+from parallel import setup_schedule, SCHEDULES, SHARING
+from text_input import read_input, is_blank, as_text
+from decoding import generation_kwargs, PROFILES
+from lexicon import load_lexicon, sentiment_label
+from backends import load_summarizer, model_label, BACKENDS, DEFAULT_BACKEND
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
 
+MODEL_NAME = "facebook/bart-large-cnn"
+
+SENTIMENT = load_lexicon("sentiment", {
+    "positive": ['good', 'great', 'excellent', 'amazing', 'wonderful', 'helpful', 'useful'],
+    "negative": ['bad', 'terrible', 'difficult', 'hard', 'problem', 'issue', 'error'],
+})
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
 class LocalAI:
-    def __init__(self):
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, chunk_overlap=0, cache=None, pool=None, backend=DEFAULT_BACKEND, fan_in=DEFAULT_FAN_IN):
         """Initialize AI pipelines"""
-        try:
-            # Text summarization
-            self.summarizer = pipeline(
-                "summarization", 
-                model="facebook/bart-large-cnn",
-                device=-1  # Use CPU
-            )
-            
-            # Question generation - using a simpler approach
-            self.question_generator = None  # We'll use rule-based question generation
-            
-            # Text classification for content analysis - using simpler approach
-            self.classifier = None  # We'll use rule-based analysis
-            
-        except Exception as e:
-            print(f"Error initializing AI models: {e}", file=sys.stderr)
-            sys.exit(1)
+        self.backend = backend
+        self.fan_in = fan_in
+        self.batch_size = batch_size
+        self.chunk_overlap = chunk_overlap
+        self.cache = cache
+        self.pool = pool  # Optional parallel.ChunkPool for the chunk map step
+        self.model_load_time = None
+        
+        # Text summarization - loaded on first use so rule-based tasks start fast
+        self._summarizer = None
+        
+        # Question generation - using a simpler approach
+        self.question_generator = None  # We'll use rule-based question generation
+        
+        # Text classification for content analysis - using simpler approach
+        self.classifier = None  # We'll use rule-based analysis
+
+    @property
+    def summarizer(self):
+        """Summarization pipeline, loaded (with transformers/torch) on first access"""
+        if self._summarizer is None and self.pool is not None and self.pool.summarizer is not None:
+            # The pool provides a pipeline sharing its workers' weights; reuse it for the reduce step
+            self._summarizer = self.pool.summarizer
+        if self._summarizer is None:
+            start = time.perf_counter()
+            try:
+                with metrics.stage("model_load"):
+                    self._summarizer = load_summarizer(MODEL_NAME, self.backend)  # CPU only
+            except Exception as e:
+                print(f"Error initializing AI models: {e}", file=sys.stderr)
+                sys.exit(1)
+            self.model_load_time = time.perf_counter() - start
+        return self._summarizer
 
-    def summarize_text(self, text, max_length=150, min_length=50):
-        """Summarize long text content"""
+    def summarize_text(self, text, max_length=150, min_length=50, profile=None):
+        """Summarize long text content, optionally with a decoding profile"""
         try:
-            # Split long text into chunks if needed
-            max_chunk_length = 1024
-            if len(text) > max_chunk_length:
-                chunks = [text[i:i+max_chunk_length] for i in range(0, len(text), max_chunk_length)]
-                summaries = []
-                
-                for chunk in chunks:
-                    if len(chunk.strip()) > 50:  # Only process meaningful chunks
-                        summary = self.summarizer(
-                            chunk,
-                            max_length=max_length,
-                            min_length=min_length,
-                            do_sample=False
-                        )
-                        summaries.append(summary[0]['summary_text'])
-                
-                # Combine and re-summarize if multiple chunks
-                if len(summaries) > 1:
-                    combined = " ".join(summaries)
-                    final_summary = self.summarizer(
-                        combined,
+            # Pack whole sentences into chunks that fit the model's token limit
+            chunks, stats = chunk_text(
+                text,
+                getattr(self.summarizer, 'tokenizer', None),
+                overlap=self.chunk_overlap
+            )
+            if len(chunks) > 1:
+                log_stats(stats)
+                if self.pool is not None:
+                    with metrics.stage("generation"):
+                        summaries = self.pool.summarize(chunks, max_length, min_length, self.batch_size, profile=profile)
+                    record_outputs(summaries, getattr(self.summarizer, 'tokenizer', None))
+                else:
+                    # Summaries arrive in document order, one batch window at a time
+                    summaries = iter_chunk_summaries(
+                        self.summarizer,
+                        chunks,
                         max_length=max_length,
                         min_length=min_length,
-                        do_sample=False
+                        batch_size=self.batch_size,
+                        profile=profile
                     )
-                    return final_summary[0]['summary_text']
-                else:
-                    return summaries[0] if summaries else "Unable to generate summary."
-            else:
-                summary = self.summarizer(
-                    text,
+                
+                # Merge chunk summaries level by level, keeping each call within the token budget
+                tree = ReduceTree(
+                    self.summarizer,
                     max_length=max_length,
                     min_length=min_length,
-                    do_sample=False
+                    fan_in=self.fan_in,
+                    budget=stats["token_budget"],
+                    tokenizer=getattr(self.summarizer, 'tokenizer', None),
+                    profile=profile
                 )
+                for summary in summaries:
+                    tree.add(summary)
+                return tree.result() or "Unable to generate summary."
+            else:
+                summarizer = self.summarizer
+                with metrics.stage("generation"):
+                    summary = summarizer(
+                        text,
+                        do_sample=False,
+                        **generation_kwargs(summarizer, [text], max_length, min_length, profile)
+                    )
+                record_outputs([summary[0]['summary_text']], getattr(summarizer, 'tokenizer', None))
                 return summary[0]['summary_text']
                 
         except Exception as e:
@@ -139,20 +188,8 @@ class LocalAI:
             else:
                 reading_level = "College"
             
-            # Simple sentiment analysis based on keywords
-            positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'helpful', 'useful']
-            negative_words = ['bad', 'terrible', 'difficult', 'hard', 'problem', 'issue', 'error']
-            
-            text_lower = text.lower()
-            positive_count = sum(1 for word in positive_words if word in text_lower)
-            negative_count = sum(1 for word in negative_words if word in text_lower)
-            
-            if positive_count > negative_count:
-                sentiment = "positive"
-            elif negative_count > positive_count:
-                sentiment = "negative"
-            else:
-                sentiment = "neutral"
+            # Simple sentiment analysis based on whole-word lexicon matches
+            sentiment = sentiment_label(SENTIMENT.scores(text))
             
             return {
                 "word_count": word_count,
@@ -174,55 +211,332 @@ class LocalAI:
                 "error": f"Error analyzing content: {str(e)}"
             }
 
-    def process_document(self, text, task="summarize"):
-        """Main processing function"""
+    def process_document(self, text, task="summarize", max_length=150, min_length=50, num_questions=5, profile=None):
+        """Main processing function, served from the result cache when enabled"""
+        params = {
+            "max_length": max_length,
+            "min_length": min_length,
+            "num_questions": num_questions,
+            "chunk_overlap": self.chunk_overlap,
+            "fan_in": self.fan_in
+        }
+        if profile:
+            params["profile"] = profile
+        return cached_call(
+            self.cache,
+            text,
+            model_label(MODEL_NAME, self.backend),
+            task,
+            params,
+            lambda: self.run_task(text, task, max_length, min_length, num_questions, profile)
+        )
+
+    def run_task(self, text, task="summarize", max_length=150, min_length=50, num_questions=5, profile=None):
+        """Run a single task without consulting the cache"""
         if task == "summarize":
-            return self.summarize_text(text)
+            return self.summarize_text(text, max_length, min_length, profile)
         elif task == "questions":
-            return self.generate_questions(text)
+            with metrics.stage("postprocess"):
+                return self.generate_questions(text, num_questions)
         elif task == "analyze":
-            return self.analyze_content(text)
+            with metrics.stage("postprocess"):
+                return self.analyze_content(text)
         elif task == "all":
-            return {
-                "summary": self.summarize_text(text),
-                "questions": self.generate_questions(text),
-                "analysis": self.analyze_content(text)
-            }
+            summary = self.summarize_text(text, max_length, min_length, profile)
+            with metrics.stage("postprocess"):
+                return {
+                    "summary": summary,
+                    "questions": self.generate_questions(text, num_questions),
+                    "analysis": self.analyze_content(text)
+                }
         else:
             return {"error": f"Unknown task: {task}"}
 
+# Tasks that run the summarization model and must not share it concurrently
+MODEL_TASKS = {"summarize", "all", "bart", "route"}
+
+class Worker:
+    """Long-lived request handler around a single loaded LocalAI instance.
+
+    Requests are JSON objects such as
+    {"id": 1, "task": "summarize", "text": "...", "params": {"max_length": 150, "profile": "fast"}}
+    and every response echoes the request id so several requests can be in
+    flight on one worker. Rule-based tasks run concurrently; tasks that touch
+    the model are serialized on a lock. A request with "metrics": true gets
+    its per-stage timings and counts back under "metrics".
+    """
+
+    def __init__(self, ai, max_workers=4):
+        self.ai = ai
+        self.started_at = time.time()
+        self.model_lock = threading.Lock()
+        from concurrent.futures import ThreadPoolExecutor
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.in_flight = 0
+        self.handled = 0
+        self._counter_lock = threading.Lock()
+
+    def health(self):
+        """Status record used for both the ready message and health checks"""
+        status = {
+            "type": "health",
+            "status": "ready",
+            "pid": os.getpid(),
+            "model": model_label(MODEL_NAME, self.ai.backend),
+            "in_flight": self.in_flight,
+            "handled": self.handled,
+            "uptime": round(time.time() - self.started_at, 3)
+        }
+        if self.ai.pool is not None:
+            status["memory"] = self.ai.pool.memory_report()
+        return status
+
+    def run_task(self, request):
+        task = request.get("task", "summarize")
+        text = request.get("text", "")
+        params = request.get("params") or {}
+        profile = params.get("profile")
+        if profile and profile not in PROFILES:
+            raise ValueError(f"Unknown decoding profile: {profile}")
+
+        if task == "route":
+            import router
+            return router.Router(
+                params.get("budget", router.DEFAULT_BUDGET),
+                summarizers={"bart": self.ai.summarizer},
+                backend=self.ai.backend,
+                max_length=params.get("max_length", 150),
+                min_length=params.get("min_length", 50)
+            ).route(text)
+        if task == "bart":
+            import bart_summarizer
+            return bart_summarizer.process_document(
+                text,
+                params.get("max_length", 150),
+                params.get("min_length", 50),
+                summarizer=self.ai.summarizer,
+                batch_size=self.ai.batch_size,
+                cache=self.ai.cache,
+                pool=self.ai.pool,
+                backend=self.ai.backend,
+                profile=profile
+            )
+        return self.ai.process_document(
+            text,
+            task,
+            max_length=params.get("max_length", 150),
+            min_length=params.get("min_length", 50),
+            num_questions=params.get("num_questions", 5),
+            profile=profile
+        )
+
+    def handle(self, request):
+        """Process one decoded request and return the response record"""
+        request_id = request.get("id")
+        task = request.get("task", "summarize")
+
+        if task == "health":
+            response = self.health()
+            response["id"] = request_id
+            return response
+
+        if not str(request.get("text", "")).strip():
+            return {"id": request_id, "type": "error", "error": "No input text provided"}
+
+        with self._counter_lock:
+            self.in_flight += 1
+        start = time.time()
+        recorder = metrics.start() if request.get("metrics") else None
+        try:
+            if task in MODEL_TASKS:
+                with self.model_lock:
+                    result = self.run_task(request)
+            else:
+                result = self.run_task(request)
+            response = {
+                "id": request_id,
+                "type": "result",
+                "task": task,
+                "result": result,
+                "elapsed": round(time.time() - start, 3)
+            }
+            if recorder:
+                response["metrics"] = recorder.to_dict()
+            return response
+        except Exception as e:
+            return {"id": request_id, "type": "error", "error": str(e)}
+        finally:
+            metrics.stop()
+            with self._counter_lock:
+                self.in_flight -= 1
+                self.handled += 1
+
+    def serve_lines(self, lines, write):
+        """Dispatch newline-delimited JSON requests, writing responses as they finish"""
+        write_lock = threading.Lock()
+
+        def emit(record):
+            with write_lock:
+                write(json.dumps(record) + "\n")
+
+        def respond(request):
+            emit(self.handle(request))
+
+        # Only unfinished requests are kept, so a long-lived worker doesn't grow
+        pending = set()
+
+        def on_done(future):
+            pending.discard(future)
+            if future.exception() is not None:
+                print(f"Error responding to request: {future.exception()}", file=sys.stderr)
+
+        emit(dict(self.health(), type="ready"))
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                emit({"id": None, "type": "error", "error": f"Invalid JSON request: {e}"})
+                continue
+            if request.get("task") == "shutdown":
+                break
+            future = self.executor.submit(respond, request)
+            pending.add(future)
+            future.add_done_callback(on_done)
+
+        wait(list(pending))
+
+def serve_stdio(worker):
+    """Serve requests on stdin/stdout until stdin is closed"""
+    def write(data):
+        sys.stdout.write(data)
+        sys.stdout.flush()
+
+    worker.serve_lines(sys.stdin, write)
+
+def serve_socket(worker, socket_path):
+    """Serve requests on a Unix domain socket, one line protocol per connection"""
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def write(data):
+                self.wfile.write(data.encode("utf-8"))
+                self.wfile.flush()
+
+            lines = (raw.decode("utf-8") for raw in self.rfile)
+            worker.serve_lines(lines, write)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    server.daemon_threads = True
+    print(f"Listening on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def report_startup(ai):
+    """Print how long imports, model loading and the whole run took"""
+    report = {
+        "imports_s": round(IMPORT_SECONDS, 4),
+        "model_load_s": round(ai.model_load_time, 4) if ai.model_load_time is not None else None,
+        "total_s": round(time.perf_counter() - IMPORT_STARTED, 4),
+        "heavy_modules": sorted(m for m in ("torch", "transformers", "tensorflow") if m in sys.modules)
+    }
+    print(f"Startup: {json.dumps(report)}", file=sys.stderr)
+
 def main():
     parser = argparse.ArgumentParser(description="Local AI Processing for MindSpark")
     parser.add_argument("--task", choices=["summarize", "questions", "analyze", "all"], 
                        default="summarize", help="AI task to perform")
     parser.add_argument("--text", type=str, help="Text to process")
     parser.add_argument("--file", type=str, help="File containing text to process")
+    parser.add_argument("--framed", action="store_true",
+                       help="Read one length-prefixed frame from stdin (4-byte big-endian length + UTF-8)")
     parser.add_argument("--output", choices=["json", "text"], default="json", 
                        help="Output format")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                       help="Number of chunks per summarization batch")
+    parser.add_argument("--overlap", type=int, default=0,
+                       help="Tokens of trailing sentences repeated between chunks")
+    parser.add_argument("--fan-in", type=int, default=DEFAULT_FAN_IN,
+                       help="Chunk summaries merged per reduce step")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Skip the persistent result cache")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                       help="Inference backend for the summarization model")
+    parser.add_argument("--profile", choices=list(PROFILES),
+                       help="Decoding profile; \"assisted\" drafts with DistilBART and verifies with BART-large")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="intra",
+                       help="intra: all cores per generate call; inter: parallel worker processes")
+    parser.add_argument("--processes", type=int,
+                       help="Worker processes for --schedule inter (default: cores / 4)")
+    parser.add_argument("--sharing", choices=SHARING, default="copy",
+                       help="How --schedule inter workers get the model: own copies, forked copy-on-write, or memory-mapped")
+    parser.add_argument("--serve", action="store_true",
+                       help="Load models once and handle newline-delimited JSON requests")
+    parser.add_argument("--socket", type=str,
+                       help="Unix socket path to serve on instead of stdin/stdout (with --serve)")
+    parser.add_argument("--workers", type=int, default=4,
+                       help="Maximum concurrent requests per server (with --serve)")
+    parser.add_argument("--startup-report", action="store_true",
+                       help="Print import, model load and total startup times to stderr")
+    metrics.add_arguments(parser)
     
     args = parser.parse_args()
+    recorder = None
+    if metrics.enabled(args) and not args.serve:
+        recorder = metrics.start()
+        recorder.add_stage("imports", IMPORT_SECONDS)
     
-    # Get input text
-    if args.text:
-        input_text = args.text
-    elif args.file:
-        try:
-            with open(args.file, 'r', encoding='utf-8') as f:
-                input_text = f.read()
-        except Exception as e:
-            print(f"Error reading file: {e}", file=sys.stderr)
-            sys.exit(1)
-    else:
-        # Read from stdin
-        input_text = sys.stdin.read()
+    cache = None if args.no_cache else open_cache()
+    
+    # Only tasks that summarize need the model, and with it the worker pool
+    pool = None
+    if args.serve or args.task in ("summarize", "all"):
+        pool = setup_schedule(args.schedule, MODEL_NAME, args.processes, args.backend, args.sharing)
+    
+    if args.serve:
+        worker = Worker(LocalAI(batch_size=args.batch_size, chunk_overlap=args.overlap, cache=cache, pool=pool, backend=args.backend, fan_in=args.fan_in), max_workers=args.workers)
+        worker.ai.summarizer  # Warm the model before reporting ready
+        if args.startup_report:
+            report_startup(worker.ai)
+        if args.socket:
+            serve_socket(worker, args.socket)
+        else:
+            serve_stdio(worker)
+        return
+    
+    # Get input text: --text, a memory-mapped --file, or stdin (optionally framed)
+    try:
+        input_text = read_input(args.text, args.file, args.framed)
+    except Exception as e:
+        source = "file" if args.file and not args.text else "input"
+        print(f"Error reading {source}: {e}", file=sys.stderr)
+        sys.exit(1)
     
-    if not input_text.strip():
+    if is_blank(input_text):
         print("Error: No input text provided", file=sys.stderr)
         sys.exit(1)
+    input_text = as_text(input_text)
     
     # Initialize AI and process
-    ai = LocalAI()
-    result = ai.process_document(input_text, args.task)
+    ai = LocalAI(batch_size=args.batch_size, chunk_overlap=args.overlap, cache=cache, pool=pool, backend=args.backend, fan_in=args.fan_in)
+    result = ai.process_document(input_text, args.task, profile=args.profile)
+    if pool is not None:
+        pool.close()
+    if args.startup_report:
+        report_startup(ai)
+    if recorder:
+        result = metrics.finish(args, recorder, result, {"script": "local_ai", "task": args.task, "backend": args.backend})
     
     # Output result
     if args.output == "json":
@@ -0,0 +1,202 @@
+"""
+Opt-in per-stage instrumentation for the MindSpark AI scripts
+Records wall time, CPU time, peak RSS and counters, and exports them
+as a JSON result field, a Prometheus textfile or a rolling JSONL log
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+JSONL_MAX_BYTES = 10 * 1024 * 1024
+
+_local = threading.local()
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def memory_usage(pid="self"):
+    """Unique and shared resident memory of a process in MB, from /proc/<pid>/smaps_rollup
+
+    `unique_mb` is memory only this process maps; `shared_mb` is mapped by
+    others too, such as copy-on-write or memory-mapped model weights. PSS
+    splits shared pages between their users, so summing it over processes
+    gives their real footprint. Returns None where smaps_rollup is missing
+    (non-Linux, or kernels before 4.14).
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None
+
+    def mb(*names):
+        return round(sum(fields.get(name, 0) for name in names) / 1024, 1)
+
+    return {
+        "rss_mb": mb("Rss"),
+        "pss_mb": mb("Pss"),
+        "unique_mb": mb("Private_Clean", "Private_Dirty"),
+        "shared_mb": mb("Shared_Clean", "Shared_Dirty")
+    }
+
+class Recorder:
+    """Stage timings and counters for one run (one document or request)
+
+    Stages may nest, so their times overlap rather than add up. Peak RSS
+    is the process-wide high-water mark when each stage finished.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+            entry["wall_s"] += time.perf_counter() - wall
+            entry["cpu_s"] += time.process_time() - cpu
+            entry["calls"] += 1
+            entry["peak_rss_mb"] = peak_rss_mb()
+
+    def add_stage(self, name, wall_s):
+        """Record a stage timed elsewhere, e.g. module imports (wall time only)"""
+        entry = self.stages.setdefault(name, {"wall_s": 0.0, "calls": 0})
+        entry["wall_s"] += wall_s
+        entry["calls"] += 1
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        stages = {
+            name: {key: round(value, 6) if isinstance(value, float) else value for key, value in entry.items()}
+            for name, entry in self.stages.items()
+        }
+        return {
+            "stages": stages,
+            "counters": dict(self.counters),
+            "total_wall_s": round(time.perf_counter() - self.started, 6),
+            "peak_rss_mb": peak_rss_mb()
+        }
+
+def start():
+    """Start recording on this thread and return the recorder"""
+    _local.recorder = Recorder()
+    return _local.recorder
+
+def stop():
+    recorder = getattr(_local, "recorder", None)
+    _local.recorder = None
+    return recorder
+
+def active():
+    return getattr(_local, "recorder", None)
+
+def stage(name):
+    """Time a stage when recording is on; a no-op context otherwise"""
+    recorder = active()
+    return recorder.stage(name) if recorder else nullcontext()
+
+def count(name, value=1):
+    recorder = active()
+    if recorder:
+        recorder.count(name, value)
+
+def _label_string(labels):
+    return ",".join(f'{key}="{str(value)}"' for key, value in sorted(labels.items()))
+
+def write_prometheus(path, data, labels):
+    """Write a run's metrics in the node_exporter textfile collector format"""
+    base = _label_string(labels)
+    lines = [
+        "# HELP mindspark_ai_stage_seconds Wall time of a processing stage in the last run",
+        "# TYPE mindspark_ai_stage_seconds gauge",
+    ]
+    for name, entry in data["stages"].items():
+        lines.append(f'mindspark_ai_stage_seconds{{{base},stage="{name}"}} {entry["wall_s"]}')
+    lines += [
+        "# HELP mindspark_ai_stage_cpu_seconds CPU time of a processing stage in the last run",
+        "# TYPE mindspark_ai_stage_cpu_seconds gauge",
+    ]
+    for name, entry in data["stages"].items():
+        if "cpu_s" not in entry:
+            continue
+        lines.append(f'mindspark_ai_stage_cpu_seconds{{{base},stage="{name}"}} {entry["cpu_s"]}')
+    lines += [
+        "# HELP mindspark_ai_count Chunk, token and call counts in the last run",
+        "# TYPE mindspark_ai_count gauge",
+    ]
+    for name, value in data["counters"].items():
+        lines.append(f'mindspark_ai_count{{{base},name="{name}"}} {value}')
+    lines += [
+        "# HELP mindspark_ai_peak_rss_megabytes Peak resident memory of the last run",
+        "# TYPE mindspark_ai_peak_rss_megabytes gauge",
+        f'mindspark_ai_peak_rss_megabytes{{{base}}} {data["peak_rss_mb"]}',
+        "# HELP mindspark_ai_total_seconds Wall time of the last run",
+        "# TYPE mindspark_ai_total_seconds gauge",
+        f'mindspark_ai_total_seconds{{{base}}} {data["total_wall_s"]}',
+    ]
+    # Write then rename so the collector never reads a partial file
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temp_path, path)
+
+def append_jsonl(path, record, max_bytes=JSONL_MAX_BYTES):
+    """Append one record, rotating the log to `path`.1 once it exceeds max_bytes"""
+    if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+        os.replace(path, f"{path}.1")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+def add_arguments(parser):
+    """CLI options shared by the AI scripts"""
+    parser.add_argument("--metrics", action="store_true",
+                        help="Record per-stage metrics and attach them to the result")
+    parser.add_argument("--metrics-prom", type=str, metavar="PATH",
+                        help="Also write the metrics as a Prometheus textfile")
+    parser.add_argument("--metrics-log", type=str, metavar="PATH",
+                        help="Also append the metrics to a rolling JSONL log")
+
+def enabled(args):
+    return bool(args.metrics or args.metrics_prom or args.metrics_log)
+
+def finish(args, recorder, result, labels):
+    """Export a finished run and return the result with its `metrics` attached"""
+    data = recorder.to_dict()
+    try:
+        if args.metrics_prom:
+            write_prometheus(args.metrics_prom, data, labels)
+        if args.metrics_log:
+            append_jsonl(args.metrics_log, dict(labels, timestamp=time.time(), metrics=data))
+    except OSError as e:
+        print(f"Could not export metrics: {e}", file=sys.stderr)
+    if not args.metrics:
+        return result
+    if isinstance(result, dict):
+        return dict(result, metrics=data)
+    return {"result": result, "metrics": data}
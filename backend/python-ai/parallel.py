@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Multi-core execution for MindSpark chunk summarization
+Controls torch threading and runs the chunk map step on a process pool
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from summarization import summarize_chunks, group_by_length, DEFAULT_BATCH_SIZE
+from backends import load_summarizer, load_mapped, export_onnx, model_label, BACKENDS, DEFAULT_BACKEND
+from metrics import memory_usage
+
+# "intra": one process uses every core inside each generate call (one big doc fast)
+# "inter": several processes split the cores and summarize chunks side by side
+SCHEDULES = ("intra", "inter")
+
+# How "inter" workers get the model weights:
+# "copy": every worker loads its own copy
+# "fork": the parent loads the model once and forks workers that share it copy-on-write
+# "mmap": workers map one exported weights file, sharing it through the page cache
+SHARING = ("copy", "fork", "mmap")
+
+_worker_summarizer = None
+
+def cpu_count():
+    """Cores available to this process, honouring CPU affinity where supported"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def configure_threads(num_threads):
+    """Pin torch intra-op threads (and the OpenMP/MKL pools behind them)"""
+    num_threads = max(1, int(num_threads))
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(num_threads)
+    # torch reads the variables above when it is first imported; only an
+    # already imported torch needs to be told directly
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(num_threads)
+    return num_threads
+
+def threads_per_process(processes):
+    return max(1, cpu_count() // max(1, processes))
+
+def _init_worker(model_name, num_threads, backend, sharing="copy"):
+    global _worker_summarizer
+    configure_threads(num_threads)
+    if sharing == "mmap":
+        _worker_summarizer = load_mapped(model_name)
+    elif sharing == "copy":
+        _worker_summarizer = load_summarizer(model_name, backend)
+    # "fork" workers inherit the pipeline the parent loaded before forking
+
+def _run_pipeline(inputs, kwargs):
+    if isinstance(kwargs.get("assistant_model"), str):
+        from decoding import draft_model
+        kwargs = dict(kwargs, assistant_model=draft_model())
+    return _worker_summarizer(inputs, **kwargs)
+
+def _summarize_group(job):
+    chunks, max_length, min_length, profile = job
+    return summarize_chunks(
+        _worker_summarizer,
+        chunks,
+        max_length=max_length,
+        min_length=min_length,
+        batch_size=len(chunks),
+        profile=profile
+    )
+
+class PooledSummarizer:
+    """Stands in for a pipeline in the parent, running every call on a pool worker
+
+    Only the tokenizer is loaded locally, for chunking and token counts.
+    """
+
+    runs_in_pool = True  # decoding.generation_kwargs leaves the draft model to the worker
+
+    def __init__(self, pool, model_name):
+        from transformers import AutoTokenizer
+        self.pool = pool
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    def __call__(self, inputs, **kwargs):
+        return self.pool.apply(_run_pipeline, (inputs, kwargs))
+
+class ChunkPool:
+    """Process pool where every worker holds the summarization model
+
+    Each of the `processes` workers gets an equal share of the cores as
+    torch threads, so workers never oversubscribe the host. `summarizer`
+    is what the caller should use for the reduce step, so it never loads
+    another private copy: the pipeline the workers were forked from, one
+    mapping the same weights file, or (for "copy") a PooledSummarizer.
+    """
+
+    def __init__(self, model_name, processes=None, backend=DEFAULT_BACKEND, sharing="copy"):
+        global _worker_summarizer
+        import multiprocessing
+
+        self.processes = processes or max(1, cpu_count() // 4)
+        self.num_threads = threads_per_process(self.processes)
+        self.summarizer = None
+        if sharing == "fork" and "fork" not in multiprocessing.get_all_start_methods():
+            print("fork is not available here; workers will load their own copies", file=sys.stderr)
+            sharing = "copy"
+        if sharing == "mmap" and backend != "pytorch":
+            raise ValueError(f"mmap sharing needs the pytorch backend, not {backend}")
+        self.sharing = sharing
+
+        if sharing == "fork":
+            # Load before forking, without running the model, so no torch
+            # thread pool exists yet for the children to inherit
+            configure_threads(self.num_threads)
+            self.summarizer = _worker_summarizer = load_summarizer(model_name, backend)
+            context = multiprocessing.get_context("fork")
+        else:
+            if sharing == "mmap":
+                # Mapping the export shares the workers' page-cache copy of the weights
+                configure_threads(self.num_threads)
+                self.summarizer = load_mapped(model_name)
+            elif backend == "onnx":
+                export_onnx(model_name)  # Once here, not racing in every worker's initializer
+            context = multiprocessing.get_context("spawn")
+        print(
+            f"🧵 Starting {self.processes} summarizer workers x {self.num_threads} threads ({model_label(model_name, backend)}, {sharing})",
+            file=sys.stderr
+        )
+        self.pool = context.Pool(
+            self.processes,
+            initializer=_init_worker,
+            initargs=(model_name, self.num_threads, backend, sharing)
+        )
+        if self.summarizer is None:
+            self.summarizer = PooledSummarizer(self.pool, model_name)
+
+    def summarize(self, chunks, max_length=150, min_length=50, batch_size=DEFAULT_BATCH_SIZE, on_summary=None, profile=None):
+        """Parallel drop-in for summarize_chunks, returning summaries in input order"""
+        # Cap group size so every worker gets a share of a short document
+        per_worker = -(-len(chunks) // self.processes)
+        groups = group_by_length(chunks, max(1, min(batch_size, per_worker)))
+        jobs = [([chunks[i] for i in indices], max_length, min_length, profile) for indices in groups]
+        summaries = [None] * len(chunks)
+        for indices, results in zip(groups, self.pool.imap(_summarize_group, jobs)):
+            for i, summary in zip(indices, results):
+                summaries[i] = summary
+                if on_summary:
+                    on_summary(i, summary)
+        return summaries
+
+    def memory_report(self):
+        """Unique, shared and proportional memory of the parent and each worker"""
+        processes = [memory_usage()]
+        # Pool keeps its worker processes in _pool; there is no public accessor
+        processes += [memory_usage(worker.pid) for worker in self.pool._pool]
+        known = [usage for usage in processes if usage]
+        return {
+            "sharing": self.sharing,
+            "parent": processes[0],
+            "workers": processes[1:],
+            "unique_mb_total": round(sum(usage["unique_mb"] for usage in known), 1),
+            "pss_mb_total": round(sum(usage["pss_mb"] for usage in known), 1)
+        }
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+def setup_schedule(schedule, model_name, processes=None, backend=DEFAULT_BACKEND, sharing="copy"):
+    """Configure threading for the chosen schedule and return a ChunkPool or None
+
+    "intra" keeps a single process on all cores; "inter" starts a pool and
+    leaves the calling process one worker's share of threads for the
+    reduce step.
+    """
+    if schedule == "inter":
+        pool = ChunkPool(model_name, processes, backend, sharing)
+        configure_threads(pool.num_threads)
+        return pool
+    configure_threads(cpu_count())
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare worker memory across model sharing modes")
+    parser.add_argument("--model", type=str, default="facebook/bart-large-cnn", help="Model to load")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Inference backend for the summarization model")
+    parser.add_argument("--processes", type=int, default=2, help="Worker processes to start")
+    parser.add_argument("--sharing", choices=SHARING, default="fork", help="How workers get the model weights")
+
+    args = parser.parse_args()
+
+    pool = ChunkPool(args.model, args.processes, args.backend, args.sharing)
+    # One chunk per worker so every worker has loaded and run the model
+    text = "Memory mapped weights let many summarizers share one copy of the model. " * 20
+    pool.summarize([text] * pool.processes, max_length=40, min_length=10, batch_size=1)
+    print(json.dumps(pool.memory_report(), indent=2))
+    pool.close()
+
+if __name__ == "__main__":
+    main()
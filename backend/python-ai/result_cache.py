@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Persistent result cache for MindSpark AI scripts
+Stores summaries, questions and analysis in SQLite keyed by content hash
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+import metrics
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mindspark", "ai_results.sqlite3")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def normalized_blocks(text, block_size=1 << 16):
+    """Lists of whitespace-separated words from a string or seekable text file object
+
+    File objects are read block by block and rewound afterwards, so large
+    memory-mapped inputs can be hashed without decoding them in one piece.
+    """
+    if isinstance(text, str):
+        yield text.split()
+        return
+    text.seek(0)
+    carry = ''
+    while True:
+        block = text.read(block_size)
+        if not block:
+            break
+        words = (carry + block).split()
+        # A word touching the end of the block may continue in the next one
+        carry = words.pop() if words and not block[-1].isspace() else ''
+        yield words
+    if carry:
+        yield [carry]
+    text.seek(0)
+
+def make_key(text, model, task, params=None):
+    """Content-addressed key from whitespace-normalized text, model, task and parameters"""
+    digest = hashlib.sha256()
+    separator = b''
+    for words in normalized_blocks(text):
+        if words:
+            digest.update(separator + ' '.join(words).encode('utf-8'))
+            separator = b' '
+    digest.update(b'\0')
+    digest.update(json.dumps([model, task, params or {}], sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def is_cacheable(result):
+    """Error results are never cached so a later run can retry them"""
+    if isinstance(result, dict):
+        return "error" not in result
+    if isinstance(result, str):
+        return not result.startswith("Error ")
+    return result is not None
+
+class ResultCache:
+    """SQLite-backed LRU cache, safe to share between processes
+
+    Entries older than `max_age` seconds are dropped, and the least recently
+    used entries are evicted once the stored values exceed `max_bytes`.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect()
+
+    def _connect(self):
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def _count(self, name):
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT value, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                if row is not None:
+                    self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._count("misses")
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return json.loads(row[0])
+
+    def put(self, key, value, task="", model=""):
+        """Store a value and evict stale or least recently used entries"""
+        with self.lock:
+            self._put(key, value, task, model)
+
+    def _put(self, key, value, task, model):
+        now = time.time()
+        data = json.dumps(value)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, task, model, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, task, model, data, len(data), now, now)
+            )
+            self._evict(now)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, now):
+        self.conn.execute("DELETE FROM results WHERE created < ?", (now - self.max_age,))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute("SELECT key, size FROM results ORDER BY accessed ASC")
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM results WHERE key = ?", stale)
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (len(stale),)
+        )
+
+    def stats(self):
+        """Entry count, stored bytes and hit/miss/eviction counters"""
+        with self.lock:
+            return self._stats()
+
+    def _stats(self):
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        counters = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0
+        }
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM results")
+            self.conn.execute("DELETE FROM counters")
+
+    def cached(self, text, model, task, params, compute, model_of=None):
+        """Return a cached result or compute, store and return it
+
+        Cache failures are reported and otherwise ignored so a locked or
+        corrupt cache never breaks document processing. `model_of(result)`
+        names the model that actually produced a result, when that can
+        differ from `model` (e.g. after a fallback); the result is then
+        stored under that model's key instead.
+        """
+        key = make_key(text, model, task, params)
+        try:
+            value = self.get(key)
+            if value is not None:
+                print(f"⚡ Cache hit for {task} ({model})", file=sys.stderr)
+                metrics.count("cache_hits")
+                return value
+        except sqlite3.Error as e:
+            print(f"Cache read failed: {e}", file=sys.stderr)
+
+        metrics.count("cache_misses")
+        value = compute()
+        if is_cacheable(value):
+            produced_by = model_of(value) if model_of else model
+            if produced_by != model:
+                key = make_key(text, produced_by, task, params)
+            try:
+                self.put(key, value, task, produced_by)
+            except sqlite3.Error as e:
+                print(f"Cache write failed: {e}", file=sys.stderr)
+        return value
+
+def open_cache():
+    """Open the default cache, configured by MINDSPARK_AI_CACHE* environment variables
+
+    Returns None when MINDSPARK_AI_CACHE is set to "off" or the cache
+    cannot be opened.
+    """
+    path = os.environ.get("MINDSPARK_AI_CACHE", DEFAULT_CACHE_PATH)
+    if path.lower() in ("off", "0", "false", "none", ""):
+        return None
+    try:
+        return ResultCache(
+            os.path.expanduser(path),
+            max_bytes=int(os.environ.get("MINDSPARK_AI_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            max_age=float(os.environ.get("MINDSPARK_AI_CACHE_MAX_AGE", DEFAULT_MAX_AGE))
+        )
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"Result cache disabled: {e}", file=sys.stderr)
+        return None
+
+def cached_call(cache, text, model, task, params, compute, model_of=None):
+    """Run compute through the cache, or directly when caching is disabled"""
+    if cache is None:
+        return compute()
+    return cache.cached(text, model, task, params, compute, model_of)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the MindSpark AI result cache")
+    parser.add_argument("--clear", action="store_true", help="Remove all cached results and counters")
+    args = parser.parse_args()
+
+    cache = open_cache()
+    if cache is None:
+        print("Error: Result cache is disabled", file=sys.stderr)
+        sys.exit(1)
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
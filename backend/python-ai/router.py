@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Deadline-aware engine router for MindSpark summarization
+Picks BART, DistilBART, TextRank or the heuristic summarizer per chunk
+so a document always gets the best summary reachable within a time budget
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from chunking import chunk_text, count_tokens
+from backends import load_summarizer, DEFAULT_BACKEND, BACKENDS
+from bart_summarizer import MODEL_NAME, FALLBACK_MODEL_NAME
+from text_input import read_input, is_blank, as_text
+import simple_ai
+
+# Engines from best to cheapest
+ENGINES = ("bart", "distilbart", "extractive", "heuristic")
+MODEL_ENGINES = {"bart": MODEL_NAME, "distilbart": FALLBACK_MODEL_NAME}
+
+# Priors until real timings have been measured on this host
+DEFAULT_TIMINGS = {
+    "bart": {"load": 15.0, "per_token": 0.006},
+    "distilbart": {"load": 8.0, "per_token": 0.003},
+    "extractive": {"load": 0.0, "per_token": 0.00002},
+    "heuristic": {"load": 0.0, "per_token": 0.000005},
+}
+TIMINGS_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mindspark", "router_timings.json")
+SMOOTHING = 0.3  # Weight of the newest measurement in the moving average
+DEFAULT_BUDGET = 25.0  # runLocalAI kills the process after 30s
+RESERVE = 0.5  # Seconds kept back for key points, merging and output
+
+class Router:
+    """Route each chunk to the best engine that still lets the document finish in time
+
+    Costs come from per-engine load time and seconds-per-token, refined
+    with every chunk processed and persisted for the next run.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, summarizers=None, backend=DEFAULT_BACKEND,
+                 max_length=150, min_length=50, timings_path=TIMINGS_PATH, idf_index=None):
+        self.budget = budget
+        self.summarizers = dict(summarizers or {})
+        self.backend = backend
+        self.max_length = max_length
+        self.min_length = min_length
+        self.timings_path = timings_path
+        self.idf_index = idf_index
+        self.unavailable = set()
+        self.timings = self._load_timings()
+
+    def _load_timings(self):
+        timings = {engine: dict(values) for engine, values in DEFAULT_TIMINGS.items()}
+        if self.timings_path and os.path.exists(self.timings_path):
+            try:
+                with open(self.timings_path, 'r', encoding='utf-8') as f:
+                    for engine, values in json.load(f).items():
+                        if engine in timings:
+                            timings[engine].update(values)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring router timings {self.timings_path}: {e}", file=sys.stderr)
+        return timings
+
+    def save_timings(self):
+        if not self.timings_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.timings_path), exist_ok=True)
+            temp_path = f"{self.timings_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.timings, f, indent=2)
+            os.replace(temp_path, self.timings_path)
+        except OSError as e:
+            print(f"Could not save router timings: {e}", file=sys.stderr)
+
+    def _record(self, engine, key, value):
+        old = self.timings[engine][key]
+        self.timings[engine][key] = (1 - SMOOTHING) * old + SMOOTHING * value
+
+    def estimate(self, engine, tokens):
+        """Predicted seconds for `engine` to summarize `tokens`, including any model load"""
+        timing = self.timings[engine]
+        load = timing["load"] if engine in MODEL_ENGINES and engine not in self.summarizers else 0.0
+        return load + timing["per_token"] * tokens
+
+    def available(self):
+        return [engine for engine in ENGINES if engine not in self.unavailable]
+
+    def pick(self, tokens, rest_tokens, time_left):
+        """Best engine for this chunk given the time left
+
+        Prefer the best engine that could also finish every remaining chunk;
+        failing that, the best one that leaves time for the cheapest engine
+        to do the rest. The heuristic is always the last resort.
+        """
+        engines = self.available()
+        for engine in engines:
+            if self.estimate(engine, tokens + rest_tokens) <= time_left:
+                return engine
+        cheapest = engines[-1]
+        floor = self.estimate(cheapest, rest_tokens)
+        for engine in engines:
+            if self.estimate(engine, tokens) + floor <= time_left:
+                return engine
+        return cheapest
+
+    def _model(self, engine):
+        if engine not in self.summarizers:
+            print(f"🔄 Loading {engine} for routing...", file=sys.stderr)
+            start = time.perf_counter()
+            self.summarizers[engine] = load_summarizer(MODEL_ENGINES[engine], self.backend)
+            self._record(engine, "load", time.perf_counter() - start)
+        return self.summarizers[engine]
+
+    def run_engine(self, engine, chunk):
+        if engine == "heuristic":
+            return simple_ai.simple_summarize(chunk, 2)
+        if engine == "extractive":
+            return simple_ai.textrank_summarize(chunk, 2, self.idf_index)
+        output = self._model(engine)(
+            chunk,
+            max_length=self.max_length,
+            min_length=self.min_length,
+            do_sample=False,
+            truncation=True
+        )
+        return output[0]['summary_text']
+
+    def route(self, text, on_part=None):
+        """Summarize text within the budget, labelling each part with its engine"""
+        start = time.perf_counter()
+        deadline = start + self.budget - RESERVE
+
+        chunks, chunk_stats = chunk_text(text)
+        tokens = count_tokens(chunks)
+        rest = sum(tokens)
+        parts = []
+
+        for i, chunk in enumerate(chunks):
+            rest -= tokens[i]
+            engine = self.pick(tokens[i], rest, deadline - time.perf_counter())
+            summary = None
+            while engine != "heuristic":
+                try:
+                    if engine in MODEL_ENGINES:
+                        self._model(engine)  # Load first: its time is recorded as "load", not "per_token"
+                    chunk_start = time.perf_counter()
+                    summary = self.run_engine(engine, chunk)
+                    break
+                except Exception as e:
+                    # Drop the failing engine for this run and pick again with the time now left
+                    print(f"❌ {engine} failed, downgrading: {e}", file=sys.stderr)
+                    self.unavailable.add(engine)
+                    engine = self.pick(tokens[i], rest, deadline - time.perf_counter())
+            if summary is None:
+                # The heuristic is the last resort, so it is never retried or dropped
+                chunk_start = time.perf_counter()
+                summary = self.run_engine(engine, chunk)
+            seconds = time.perf_counter() - chunk_start
+            if tokens[i]:
+                self._record(engine, "per_token", seconds / tokens[i])
+
+            part = {"index": i, "engine": engine, "summary": summary, "seconds": round(seconds, 3)}
+            parts.append(part)
+            print(f"🧭 Chunk {i+1}/{len(chunks)} -> {engine} ({part['seconds']}s)", file=sys.stderr)
+            if on_part:
+                on_part(part)
+
+        self.save_timings()
+        elapsed = time.perf_counter() - start
+        engines_used = {}
+        for part in parts:
+            engines_used[part["engine"]] = engines_used.get(part["engine"], 0) + 1
+
+        return {
+            "summary": ' '.join(part["summary"] for part in parts),
+            "parts": parts,
+            "engines": engines_used,
+            "processedBy": "Deadline Router",
+            "budget": self.budget,
+            "elapsed": round(elapsed, 3),
+            "deadlineMet": elapsed <= self.budget,
+            "chunkCount": len(chunks),
+            "chunkStats": chunk_stats
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Deadline-aware summarization router for MindSpark")
+    parser.add_argument("--text", type=str, help="Text to process")
+    parser.add_argument("--file", type=str, help="File containing text to process (memory-mapped)")
+    parser.add_argument("--framed", action="store_true",
+                        help="Read one length-prefixed frame from stdin (4-byte big-endian length + UTF-8)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Latency budget in seconds")
+    parser.add_argument("--max-length", type=int, default=150, help="Maximum summary length")
+    parser.add_argument("--min-length", type=int, default=50, help="Minimum summary length")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Inference backend for the model engines")
+    parser.add_argument("--idf", type=str, help="Corpus IDF index for the extractive engine")
+
+    args = parser.parse_args()
+
+    try:
+        text = read_input(args.text, args.file, args.framed)
+    except Exception as e:
+        source = "file" if args.file and not args.text else "input"
+        print(f"Error reading {source}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if is_blank(text):
+        print("Error: No input text provided", file=sys.stderr)
+        sys.exit(1)
+
+    idf_index = simple_ai.IDFIndex.load(args.idf) if args.idf else None
+    router = Router(args.budget, backend=args.backend, max_length=args.max_length,
+                    min_length=args.min_length, idf_index=idf_index)
+    print(json.dumps(router.route(as_text(text)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -4,40 +4,193 @@ Simple AI Processing Script for MindSpark
 Provides basic text processing without heavy AI models
 """
 
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import sys
 import json
 import argparse
+import os
 import re
+import math
+import heapq
+import metrics
+from result_cache import open_cache, cached_call
+from document_model import Document, as_document, stream_sentences
+from lexicon import load_lexicon, sentiment_label
+from text_input import read_input, is_blank, as_text
+
+SENTIMENT = load_lexicon("sentiment", {
+    "positive": ['good', 'great', 'excellent', 'amazing', 'helpful', 'useful', 'important'],
+    "negative": ['bad', 'difficult', 'hard', 'problem', 'issue', 'error', 'wrong'],
+})
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 
 def simple_summarize(text, max_sentences=3):
-    """Create a simple summary by extracting key sentences"""
-    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    """Create a simple summary by extracting key sentences
+
+    `text` may be a string, a Document or a seekable text file object.
+    Sentences are streamed twice (once to count, once to score) and only
+    the current top `max_sentences` are kept, on a heap keyed by score
+    and sentence index, so memory is bounded for multi-megabyte input.
+    Ties go to the earlier sentence.
+    """
+    if hasattr(text, 'seek'):
+        text.seek(0)  # The file may already have been read, e.g. by an earlier call
+    sentence_count = sum(1 for _ in stream_sentences(text))
+    if hasattr(text, 'seek'):
+        text.seek(0)
     
-    if len(sentences) <= max_sentences:
-        return '. '.join(sentences) + '.'
+    if sentence_count <= max_sentences:
+        return '. '.join(stream_sentences(text)) + '.'
     
     # Score sentences based on length and position
-    scored_sentences = []
-    for i, sentence in enumerate(sentences):
+    half = sentence_count // 2
+    top = []
+    for i, sentence in enumerate(stream_sentences(text)):
         score = len(sentence.split())  # Word count
         if i == 0:  # First sentence bonus
             score += 10
-        if i < len(sentences) // 2:  # First half bonus
+        if i < half:  # First half bonus
             score += 5
-        scored_sentences.append((score, sentence))
-    
-    # Get top sentences
-    scored_sentences.sort(reverse=True)
-    top_sentences = [s[1] for s in scored_sentences[:max_sentences]]
+        entry = (score, -i, sentence)
+        if len(top) < max_sentences:
+            heapq.heappush(top, entry)
+        elif entry > top[0]:
+            heapq.heapreplace(top, entry)
     
     # Maintain original order
-    summary_sentences = []
-    for sentence in sentences:
-        if sentence in top_sentences:
-            summary_sentences.append(sentence)
+    summary_sentences = [sentence for _, _, sentence in sorted(top, key=lambda entry: -entry[1])]
     
     return '. '.join(summary_sentences) + '.'
 
+STOPWORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'this', 'that', 'these', 'those', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may',
+    'might', 'can', 'shall', 'it', 'its', 'as', 'from', 'not', 'they', 'their', 'which'
+}
+TERM_PATTERN = re.compile(r"[a-z][a-z0-9']+")
+SUMMARY_METHODS = ("heuristic", "textrank")
+
+class IDFIndex:
+    """Corpus-wide document frequencies, persisted as JSON"""
+
+    def __init__(self, documents=0, df=None, path=None):
+        self.documents = documents
+        self.df = df or {}
+        self.path = path
+
+    @classmethod
+    def build(cls, texts):
+        index = cls()
+        for text in texts:
+            index.documents += 1
+            for term in set(TERM_PATTERN.findall(text.lower())):
+                if term not in STOPWORDS:
+                    index.df[term] = index.df.get(term, 0) + 1
+        return index
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["documents"], data["df"], path)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"documents": self.documents, "df": self.df}, f)
+        self.path = path
+
+    def idf(self, term):
+        """Smoothed IDF; terms the corpus never saw get the highest weight"""
+        return math.log((1 + self.documents) / (1 + self.df.get(term, 0))) + 1
+
+    def signature(self):
+        return {"path": self.path, "documents": self.documents, "terms": len(self.df)}
+
+def textrank_summarize(text, max_sentences=3, idf_index=None, damping=0.85, iterations=50, tolerance=1e-6):
+    """Extractive summary by TF-IDF sentence centrality (TextRank) using NumPy
+
+    Sentences become L2-normalised TF-IDF rows of a sparse sentence-term
+    matrix X held as coordinate arrays. PageRank over the cosine graph
+    S = X X^T is run by power iteration without building S: each step
+    computes X (X^T p) with two bincounts, so cost is linear in the number
+    of non-zero entries. The self-similarity diagonal is excluded, and a
+    sentence sharing no terms with the others links to nothing.
+    """
+    import numpy as np
+
+    doc = text if isinstance(text, Document) else Document(as_text(text))
+    sentences = doc.sentences
+    if len(sentences) <= max_sentences:
+        return '. '.join(sentences) + '.'
+
+    # Sparse sentence-term counts in coordinate form
+    vocabulary = {}
+    rows = []
+    cols = []
+    for i, sentence in enumerate(sentences):
+        for term in TERM_PATTERN.findall(sentence.lower()):
+            if term not in STOPWORDS:
+                rows.append(i)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+    n = len(sentences)
+    if not vocabulary:
+        return simple_summarize(doc, max_sentences)
+
+    keys = np.asarray(rows, dtype=np.int64) * len(vocabulary) + np.asarray(cols, dtype=np.int64)
+    keys, counts = np.unique(keys, return_counts=True)
+    rows = keys // len(vocabulary)
+    cols = keys % len(vocabulary)
+
+    # TF-IDF weights, from the corpus index when one is given
+    if idf_index is not None:
+        idf = np.array([idf_index.idf(term) for term in vocabulary])
+    else:
+        df = np.bincount(cols, minlength=len(vocabulary))
+        idf = np.log((1 + n) / (1 + df)) + 1
+    values = (1 + np.log(counts)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=n))
+    values = values / norms[rows]
+    # Exact diagonal of X X^T, so subtracting it leaves no rounding residue
+    self_similarity = np.bincount(rows, weights=values * values, minlength=n)
+
+    def similarity_times(vector):
+        # (X X^T - diag) vector, never materialising the n x n similarity matrix
+        projected = np.bincount(cols, weights=values * vector[rows], minlength=len(vocabulary))
+        return np.bincount(rows, weights=values * projected[cols], minlength=n) - vector * self_similarity
+
+    # Sentences sharing no terms with any other are dangling: they pass on no score
+    degree = similarity_times(np.ones(n))
+    dangling = degree < 1e-12
+    degree[dangling] = 1.0
+    outgoing = np.where(dangling, 0.0, 1.0 / degree)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * similarity_times(scores * outgoing)
+        if np.abs(updated - scores).sum() < tolerance:
+            scores = updated
+            break
+        scores = updated
+
+    # Top-k by score, ties to the earlier sentence, then back in document order
+    order = np.lexsort((np.arange(n), -scores))[:max_sentences]
+    return '. '.join(sentences[i] for i in sorted(order.tolist())) + '.'
+
+def summarize(text, max_sentences=3, method="heuristic", idf_index=None):
+    """Summarize with the chosen extractive method
+
+    textrank needs NumPy; without it the heuristic summary is returned.
+    """
+    if method == "textrank":
+        try:
+            return textrank_summarize(text, max_sentences, idf_index)
+        except ImportError:
+            print("NumPy is not installed, using the heuristic summarizer", file=sys.stderr)
+    return simple_summarize(text, max_sentences)
+
 def generate_questions(text, num_questions=5):
     """Generate questions from text content"""
     questions = [
@@ -49,7 +202,7 @@ def generate_questions(text, num_questions=5):
     ]
     
     # Try to generate specific questions from content
-    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    sentences = as_document(text).sentences
     specific_questions = []
     
     for sentence in sentences[:3]:
@@ -70,11 +223,10 @@ def generate_questions(text, num_questions=5):
 
 def analyze_content(text):
     """Analyze content complexity"""
-    words = text.split()
-    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    doc = as_document(text)
     
-    word_count = len(words)
-    sentence_count = len(sentences)
+    word_count = doc.word_count
+    sentence_count = doc.sentence_count
     avg_words_per_sentence = word_count / max(sentence_count, 1)
     
     # Reading level assessment
@@ -87,20 +239,8 @@ def analyze_content(text):
     else:
         reading_level = "College"
     
-    # Simple sentiment
-    positive_words = ['good', 'great', 'excellent', 'amazing', 'helpful', 'useful', 'important']
-    negative_words = ['bad', 'difficult', 'hard', 'problem', 'issue', 'error', 'wrong']
-    
-    text_lower = text.lower()
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
-    
-    if positive_count > negative_count:
-        sentiment = "positive"
-    elif negative_count > positive_count:
-        sentiment = "negative"
-    else:
-        sentiment = "neutral"
+    # Simple sentiment: weighted lexicon matches over the whole document
+    sentiment = sentiment_label(SENTIMENT.scores(doc))
     
     return {
         "word_count": word_count,
@@ -111,54 +251,115 @@ def analyze_content(text):
         "complexity_score": min(100, max(0, int(avg_words_per_sentence * 4)))
     }
 
-def process_document(text, task="all"):
-    """Main processing function"""
+def process_document(text, task="all", cache=None, method="heuristic", idf_index=None):
+    """Main processing function, served from the result cache when one is given"""
+    params = {}
+    if method != "heuristic":
+        params = {"method": method, "idf": idf_index.signature() if idf_index else None}
+    return cached_call(cache, text, "simple_ai", task, params, lambda: run_task(text, task, method, idf_index))
+
+def run_task(text, task="all", method="heuristic", idf_index=None):
+    """Run a single task without consulting the cache
+
+    Summaries stream a memory-mapped input block by block; the other
+    tasks decode it in full once.
+    """
     if task == "summarize":
-        return simple_summarize(text)
+        with metrics.stage("generation"):
+            return summarize(text, method=method, idf_index=idf_index)
     elif task == "questions":
-        return generate_questions(text)
+        with metrics.stage("postprocess"):
+            return generate_questions(as_text(text))
     elif task == "analyze":
-        return analyze_content(text)
+        with metrics.stage("postprocess"):
+            return analyze_content(as_text(text))
     elif task == "all":
-        return {
-            "summary": simple_summarize(text),
-            "questions": generate_questions(text),
-            "analysis": analyze_content(text)
-        }
+        # Segment once and share the document model across all three tasks
+        with metrics.stage("tokenization"):
+            doc = Document(as_text(text))
+            metrics.count("sentences", len(doc.sentences))
+        with metrics.stage("generation"):
+            summary = summarize(doc, method=method, idf_index=idf_index)
+        with metrics.stage("postprocess"):
+            return {
+                "summary": summary,
+                "questions": generate_questions(doc),
+                "analysis": analyze_content(doc)
+            }
     else:
         return {"error": f"Unknown task: {task}"}
 
+def build_idf(directory, path):
+    """Build and save a corpus IDF index from every .txt file under directory"""
+    def texts():
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if name.endswith('.txt'):
+                    with open(os.path.join(root, name), 'r', encoding='utf-8', errors='replace') as f:
+                        yield f.read()
+
+    index = IDFIndex.build(texts())
+    index.save(path)
+    print(f"Indexed {index.documents} documents, {len(index.df)} terms into {path}", file=sys.stderr)
+
 def main():
     parser = argparse.ArgumentParser(description="Simple AI Processing for MindSpark")
     parser.add_argument("--task", choices=["summarize", "questions", "analyze", "all"], 
                        default="summarize", help="AI task to perform")
     parser.add_argument("--text", type=str, help="Text to process")
     parser.add_argument("--file", type=str, help="File containing text to process")
+    parser.add_argument("--framed", action="store_true",
+                       help="Read one length-prefixed frame from stdin (4-byte big-endian length + UTF-8)")
     parser.add_argument("--output", choices=["json", "text"], default="json", 
                        help="Output format")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Skip the persistent result cache")
+    parser.add_argument("--method", choices=SUMMARY_METHODS, default="heuristic",
+                       help="Extractive summarizer: position/length heuristic or TF-IDF TextRank")
+    parser.add_argument("--idf", type=str,
+                       help="Corpus IDF index (JSON) for --method textrank")
+    parser.add_argument("--build-idf", type=str, metavar="DIR",
+                       help="Build the --idf index from the .txt documents in DIR and exit")
+    metrics.add_arguments(parser)
     
     args = parser.parse_args()
+    recorder = None
+    if metrics.enabled(args) and not args.build_idf:
+        recorder = metrics.start()
+        recorder.add_stage("imports", IMPORT_SECONDS)
     
-    # Get input text
-    if args.text:
-        input_text = args.text
-    elif args.file:
+    if args.build_idf:
+        if not args.idf:
+            print("Error: --build-idf needs --idf to write the index to", file=sys.stderr)
+            sys.exit(1)
+        build_idf(args.build_idf, args.idf)
+        return
+    
+    idf_index = None
+    if args.idf:
         try:
-            with open(args.file, 'r', encoding='utf-8') as f:
-                input_text = f.read()
+            idf_index = IDFIndex.load(args.idf)
         except Exception as e:
-            print(f"Error reading file: {e}", file=sys.stderr)
+            print(f"Error reading IDF index: {e}", file=sys.stderr)
             sys.exit(1)
-    else:
-        # Read from stdin
-        input_text = sys.stdin.read()
     
-    if not input_text.strip():
+    # Get input text: --text, a memory-mapped --file, or stdin (optionally framed)
+    try:
+        input_text = read_input(args.text, args.file, args.framed)
+    except Exception as e:
+        source = "file" if args.file and not args.text else "input"
+        print(f"Error reading {source}: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    if is_blank(input_text):
         print("Error: No input text provided", file=sys.stderr)
         sys.exit(1)
     
     # Process
-    result = process_document(input_text, args.task)
+    cache = None if args.no_cache else open_cache()
+    result = process_document(input_text, args.task, cache, args.method, idf_index)
+    if recorder:
+        result = metrics.finish(args, recorder, result, {"script": "simple_ai", "task": args.task, "method": args.method})
     
     # Output result
     if args.output == "json":
@@ -0,0 +1,198 @@
+"""
+Shared chunk summarization helpers for MindSpark
+Sends chunk lists through a HuggingFace summarization pipeline in batches
+"""
+
+import sys
+
+import metrics
+from chunking import count_tokens, DEFAULT_MAX_TOKENS
+from decoding import generation_kwargs, is_assisted
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_FAN_IN = 8
+
+def fallback_summary(chunk):
+    """Fallback to the first few sentences when the model fails on a chunk"""
+    sentences = chunk.split('.')[:3]
+    return '. '.join(sentences) + '.'
+
+def is_fallback(chunk, summary):
+    """Whether summary is the fallback_summary of chunk rather than model output"""
+    return summary == fallback_summary(chunk)
+
+def record_outputs(summaries, tokenizer=None):
+    """Count generated summaries and their tokens when metrics are on
+
+    Pass the pipeline's tokenizer so tokens_out is measured like tokens_in.
+    """
+    if metrics.active():
+        metrics.count("generated", len(summaries))
+        metrics.count("tokens_out", sum(count_tokens(summaries, tokenizer)))
+
+def group_by_length(chunks, batch_size):
+    """Group chunk indices into batches of similar length to keep padding low"""
+    order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+def summarize_chunks(summarizer, chunks, max_length=150, min_length=50, batch_size=DEFAULT_BATCH_SIZE, on_summary=None, profile=None):
+    """Summarize chunks in length-grouped batches, returning summaries in input order
+
+    A batch that fails is retried chunk by chunk so one bad chunk only
+    falls back to its own leading sentences. `on_summary(index, summary)`
+    is called as soon as each chunk's summary is ready. `profile` selects
+    a decoding profile from decoding.PROFILES.
+    """
+    summaries = [None] * len(chunks)
+    if is_assisted(profile):
+        batch_size = 1  # Assisted generation drafts for one sequence at a time
+    batches = group_by_length(chunks, max(1, batch_size))
+
+    for b, indices in enumerate(batches):
+        batch = [chunks[i] for i in indices]
+        print(f"🧠 Summarizing batch {b+1}/{len(batches)} ({len(batch)} chunks)...", file=sys.stderr)
+        try:
+            with metrics.stage("generation"):
+                outputs = summarizer(
+                    batch,
+                    do_sample=False,
+                    truncation=True,
+                    batch_size=len(batch),
+                    **generation_kwargs(summarizer, batch, max_length, min_length, profile)
+                )
+            record_outputs([output['summary_text'] for output in outputs], getattr(summarizer, 'tokenizer', None))
+            for i, output in zip(indices, outputs):
+                summaries[i] = output['summary_text']
+                if on_summary:
+                    on_summary(i, summaries[i])
+        except Exception as e:
+            print(f"❌ Batch {b+1} failed, retrying chunks individually: {e}", file=sys.stderr)
+            for i in indices:
+                try:
+                    with metrics.stage("generation"):
+                        output = summarizer(
+                            chunks[i],
+                            do_sample=False,
+                            truncation=True,
+                            **generation_kwargs(summarizer, [chunks[i]], max_length, min_length, profile)
+                        )
+                    summaries[i] = output[0]['summary_text']
+                    record_outputs([summaries[i]], getattr(summarizer, 'tokenizer', None))
+                except Exception as e2:
+                    print(f"❌ Failed to summarize chunk {i+1}: {e2}", file=sys.stderr)
+                    summaries[i] = fallback_summary(chunks[i])
+                if on_summary:
+                    on_summary(i, summaries[i])
+
+    return summaries
+
+def iter_chunk_summaries(summarizer, chunks, max_length=150, min_length=50, batch_size=DEFAULT_BATCH_SIZE, profile=None):
+    """Yield chunk summaries in document order, one batch window at a time"""
+    batch_size = max(1, batch_size)
+    for start in range(0, len(chunks), batch_size):
+        yield from summarize_chunks(
+            summarizer,
+            chunks[start:start + batch_size],
+            max_length=max_length,
+            min_length=min_length,
+            batch_size=batch_size,
+            profile=profile
+        )
+
+def starts_new_merge(group_size, group_tokens, tokens, fan_in, budget):
+    """Whether a summary of `tokens` must start a new merge group instead of joining the current one
+
+    A group holds at most `fan_in` summaries and `budget` tokens, but always
+    takes at least two, so every level of a reduce shrinks.
+    """
+    return group_size >= 2 and (group_size >= fan_in or group_tokens + tokens > budget)
+
+def pack_merges(summaries, tokens, fan_in=DEFAULT_FAN_IN, budget=DEFAULT_MAX_TOKENS):
+    """Split one level of summaries, in order, into the groups ReduceTree would merge"""
+    fan_in = max(2, fan_in)
+    groups = []
+    group, group_tokens = [], 0
+    for summary, count in zip(summaries, tokens):
+        if starts_new_merge(len(group), group_tokens, count, fan_in, budget):
+            groups.append(group)
+            group, group_tokens = [], 0
+        group.append(summary)
+        group_tokens += count
+    if group:
+        groups.append(group)
+    return groups
+
+class ReduceTree:
+    """Streaming multi-level reduce of chunk summaries into one summary
+
+    Summaries are added in document order. Each level buffers at most
+    `fan_in` summaries (and at most `budget` tokens); a full level is
+    summarized into one entry of the level above. Memory stays bounded by
+    fan_in times the tree depth, and every model call fits the token budget
+    unless two summaries alone exceed it. Groups follow starts_new_merge,
+    like pack_merges.
+    """
+
+    def __init__(self, summarizer, max_length=150, min_length=50, fan_in=DEFAULT_FAN_IN, budget=DEFAULT_MAX_TOKENS, tokenizer=None, profile=None):
+        self.summarizer = summarizer
+        self.profile = profile
+        self.max_length = max_length
+        self.min_length = min_length
+        self.fan_in = max(2, fan_in)
+        self.budget = budget
+        self.tokenizer = tokenizer
+        self.levels = []
+        self.reduce_calls = 0
+
+    def add(self, summary, level=0, tokens=None):
+        if tokens is None:
+            tokens = count_tokens([summary], self.tokenizer)[0]
+        while len(self.levels) <= level:
+            self.levels.append([])
+        if starts_new_merge(len(self.levels[level]), sum(t for _, t in self.levels[level]), tokens, self.fan_in, self.budget):
+            self._flush(level)
+        buffer = self.levels[level]  # _flush replaces the level's list
+        buffer.append((summary, tokens))
+        if len(buffer) >= self.fan_in:
+            self._flush(level)
+
+    def _flush(self, level):
+        items = self.levels[level]
+        self.levels[level] = []
+        if len(items) == 1:
+            # A lone summary moves up unchanged rather than costing a model call
+            self.add(items[0][0], level + 1, items[0][1])
+            return
+        combined = ' '.join(text for text, _ in items)
+        print(f"🌲 Reducing {len(items)} summaries at level {level + 1}...", file=sys.stderr)
+        self.reduce_calls += 1
+        try:
+            with metrics.stage("reduce"):
+                output = self.summarizer(
+                    combined,
+                    do_sample=False,
+                    truncation=True,
+                    **generation_kwargs(self.summarizer, [combined], self.max_length, self.min_length, self.profile)
+                )
+            reduced = output[0]['summary_text']
+            record_outputs([reduced], self.tokenizer)
+        except Exception as e:
+            print(f"❌ Failed to reduce level {level + 1}: {e}", file=sys.stderr)
+            reduced = fallback_summary(combined)
+        self.add(reduced, level + 1)
+
+    def result(self):
+        """Reduce whatever is still buffered and return the single final summary"""
+        level = 0
+        while level < len(self.levels):
+            buffer = self.levels[level]
+            higher = any(self.levels[above] for above in range(level + 1, len(self.levels)))
+            if buffer and not higher and len(buffer) == 1:
+                return buffer[0][0]
+            if buffer:
+                self._flush(level)
+            level += 1
+        return None
+
+    def stats(self):
+        return {"depth": len(self.levels), "reduce_calls": self.reduce_calls, "fan_in": self.fan_in}
@@ -0,0 +1,32 @@
+"""
+TextRank regression checks for MindSpark
+Run with: python3 -m unittest test_textrank (from backend/python-ai)
+"""
+
+import os
+import unittest
+
+try:
+    import numpy  # noqa: F401
+except ImportError:
+    numpy = None
+
+from simple_ai import textrank_summarize
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class IsolatedSentenceTest(unittest.TestCase):
+    """A sentence sharing no terms with the rest must not outrank central ones"""
+
+    def test_connected_sentences_win(self):
+        text = "Cats eat fish daily. Cats like fish a lot. Dogs bark at night. Birds sing at dawn. The moon rises slowly."
+        self.assertEqual(textrank_summarize(text, 2), "Cats eat fish daily. Cats like fish a lot.")
+
+    def test_appended_outlier_is_not_selected(self):
+        with open(os.path.join(FIXTURES, "photosynthesis.txt"), encoding="utf-8") as f:
+            text = f.read().rstrip() + " Questions welcome anytime."
+        self.assertNotIn("Questions welcome anytime", textrank_summarize(text, 3))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Input handling shared by the MindSpark AI scripts
+Reads documents from argv, stdin, memory-mapped files or length-prefixed frames
+"""
+
+import os
+import sys
+import mmap
+import codecs
+import struct
+
+BLOCK_SIZE = 1 << 16
+FRAME_HEADER = struct.Struct('>I')  # 4-byte big-endian payload length
+
+class MappedText:
+    """Read-only memory map of a UTF-8 file, decoded lazily
+
+    Behaves like a seekable text file (`read`, `seek(0)`) so streaming
+    consumers decode one block at a time; `text()` decodes the whole file
+    straight from the mapping without an intermediate bytes copy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = open(path, 'rb')
+        # mmap cannot map empty files
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.seek(0)
+
+    def seek(self, offset):
+        if offset != 0:
+            raise ValueError("MappedText only supports seeking to the start")
+        self._pos = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def read(self, size=-1):
+        """Decode up to `size` bytes from the current position"""
+        end = self.size if size is None or size < 0 else min(self.size, self._pos + size)
+        block = self._map[self._pos:end]
+        self._pos = end
+        return self._decoder.decode(block, final=end >= self.size)
+
+    def validate(self):
+        """Raise UnicodeDecodeError now, rather than midway through processing, if the file is not UTF-8"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for start in range(0, self.size, BLOCK_SIZE):
+            decoder.decode(self._map[start:start + BLOCK_SIZE], final=start + BLOCK_SIZE >= self.size)
+
+    def text(self):
+        return str(memoryview(self._map), 'utf-8') if self.size else ''
+
+    def is_blank(self):
+        """True when the file holds only whitespace, checked block by block"""
+        for start in range(0, self.size, BLOCK_SIZE):
+            if self._map[start:start + BLOCK_SIZE].strip():
+                return False
+        return True
+
+    def close(self):
+        if self.size:
+            self._map.close()
+        self._file.close()
+
+def read_frame(stream):
+    """Read one length-prefixed frame (4-byte big-endian length, UTF-8 payload)"""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        raise ValueError("Truncated frame header")
+    (length,) = FRAME_HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise ValueError(f"Truncated frame: expected {length} bytes, got {len(payload)}")
+    return str(memoryview(payload), 'utf-8')
+
+def write_frame(stream, text):
+    """Write text as one length-prefixed frame"""
+    payload = text.encode('utf-8')
+    stream.write(FRAME_HEADER.pack(len(payload)))
+    stream.write(payload)
+
+def as_text(source):
+    """Full string for a str or MappedText input"""
+    return source if isinstance(source, str) else source.text()
+
+def read_input(text=None, file=None, framed=False):
+    """Resolve CLI input to a str, or a MappedText for --file
+
+    Precedence matches the scripts' options: --text, then --file, then a
+    framed or plain document on stdin.
+    """
+    if text:
+        return text
+    if file:
+        source = MappedText(file)
+        try:
+            source.validate()
+        except UnicodeDecodeError:
+            source.close()
+            raise
+        return source
+    if framed:
+        return read_frame(sys.stdin.buffer)
+    return str(memoryview(sys.stdin.buffer.read()), 'utf-8')
+
+def is_blank(source):
+    return source.is_blank() if isinstance(source, MappedText) else not source.strip()
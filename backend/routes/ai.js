@@ -760,7 +760,8 @@ router.post('/save-to-library', authenticateToken, async (req, res) => {
 async function runLocalAI(content) {
   return new Promise((resolve, reject) => {
     const pythonScript = path.join(__dirname, '..', 'python-ai', 'simple_ai.py');
-    const python = spawn('python', [pythonScript, '--task', 'all', '--text', content, '--output', 'json']);
+    // Send the document on stdin rather than argv so large texts don't hit ARG_MAX
+    const python = spawn('python', [pythonScript, '--task', 'all', '--output', 'json']);
 
     let output = '';
     let error = '';
@@ -787,6 +788,9 @@ async function runLocalAI(content) {
       }
     });
 
+    python.stdin.on('error', () => {}); // Reported through the close handler
+    python.stdin.end(content);
+
     // Set timeout
     setTimeout(() => {
       python.kill();